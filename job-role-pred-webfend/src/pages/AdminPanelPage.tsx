@@ -4,12 +4,15 @@ import { useState, useEffect } from "react";
 import { useAuth } from "../auth/AuthContext";
 import "../styles/admin.css";
 
+// stop polling a training job after this long; the job itself keeps running
+const TRAIN_POLL_TIMEOUT_MS = 30 * 60 * 1000;
+
 interface AdminStats {
   total_users: number;
   predictions: number;
   approved_roles: number;
   flagged_predictions: number;
-  model_accuracy: number;
+  model_accuracy: number | null;
 }
 
 interface RecentActivity {
@@ -66,7 +69,28 @@ export default function AdminPanelPage() {
       });
 
       const trainData = await trainRes.json();
-      if (!trainRes.ok) throw new Error(trainData.message || "Training failed");
+      if (!trainRes.ok) throw new Error(trainData.error || "Training failed");
+
+      // training runs as a background job; poll until it finishes (or give up)
+      let job = trainData;
+      const pollDeadline = Date.now() + TRAIN_POLL_TIMEOUT_MS;
+      while (job.status === "QUEUED" || job.status === "RUNNING") {
+        if (Date.now() > pollDeadline) {
+          throw new Error(
+            `Training job ${trainData.job_id} is still ${job.status.toLowerCase()} after ` +
+            `${TRAIN_POLL_TIMEOUT_MS / 60000} minutes; check its status later`
+          );
+        }
+        setStatus(`Training… ${job.stage || "queued"} (${job.progress}%)`);
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+
+        const jobRes = await fetch(`${API}/api/ml/admin/train/${trainData.job_id}/`, {
+          headers: { Authorization: `Bearer ${token}` },
+        });
+        job = await jobRes.json();
+        if (!jobRes.ok) throw new Error(job.error || "Failed to fetch training status");
+      }
+      if (job.status === "FAILED") throw new Error(job.error || "Training failed");
 
       //Fetch metadata immediately after
       const metaRes = await fetch(`${API}/api/ml/metadata/`);
@@ -147,9 +171,11 @@ export default function AdminPanelPage() {
 
           <div className="aCard">
             <div className="aLabel">Model Accuracy</div>
-            <div className="aValue">{loading ? '...' : Math.round(stats.model_accuracy * 100)}%</div>
+            <div className="aValue">
+              {loading ? '...' : stats.model_accuracy == null ? '—' : `${Math.round(stats.model_accuracy * 100)}%`}
+            </div>
             <div className="meter">
-              <div className="meterFill" style={{ width: `${stats.model_accuracy * 100}%` }} />
+              <div className="meterFill" style={{ width: `${(stats.model_accuracy ?? 0) * 100}%` }} />
             </div>
           </div>
         </section>
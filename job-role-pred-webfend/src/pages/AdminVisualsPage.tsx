@@ -16,7 +16,7 @@ interface AdminStats {
   predictions: number;
   approved_roles: number;
   flagged_predictions: number;
-  model_accuracy: number;
+  model_accuracy: number | null;
 }
 
 export default function AdminVisualizations() {
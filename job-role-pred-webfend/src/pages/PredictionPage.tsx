@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import Select from "react-select";
 import NavBar from "../components/NavBar";
 import Footer from "../components/Footer";
@@ -29,6 +29,10 @@ export default function PredictionPage() {
   const [error, setError] = useState<string | null>(null);
   const [predictionId, setPredictionId] = useState<number | null>(null);
   const [feedbackStatus, setFeedbackStatus] = useState<"idle" | "approved" | "flagged">("idle");
+  const [reasonsPending, setReasonsPending] = useState(false);
+
+  // latest prediction id, so a slow explanation poll never overwrites newer results
+  const latestPredictionRef = useRef<number | null>(null);
 
   const [metadata, setMetadata] = useState<{
     qualification: string[];
@@ -55,6 +59,48 @@ export default function PredictionPage() {
 
   const skillOptions = metadata?.skills.map((s) => ({ label: s, value: s })) || [];
 
+  const formatResults = (results: any[]): RolePred[] =>
+    results.map((item: any) => ({
+      role: item.role,
+      confidence: Math.round(Number(item.confidence)),
+      reasons: Array.isArray(item.reasons) ? item.reasons : [],
+    }));
+
+  // Reasons are computed in the background; poll until they are ready
+  const pollExplanation = async (id: number, entryId: number) => {
+    const token = localStorage.getItem("access");
+    const API = import.meta.env.VITE_API_BASE;
+
+    for (let attempt = 0; attempt < 30; attempt++) {
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+      if (latestPredictionRef.current !== id) return;
+
+      try {
+        const resp = await fetch(`${API}/api/ml/prediction/${id}/explanation/`, {
+          headers: token ? { Authorization: `Bearer ${token}` } : {},
+        });
+        if (!resp.ok) break;
+
+        const data = await resp.json();
+        if (data.status === "PENDING") continue;
+
+        if (data.status === "READY" && latestPredictionRef.current === id) {
+          const formatted = formatResults(data.predicted_role || []);
+          setPreds(formatted);
+          setHistory((prev) =>
+            prev.map((h) => (h.id === entryId ? { ...h, results: formatted } : h))
+          );
+        }
+        break;
+      } catch (err) {
+        console.error("Explanation error:", err);
+        break;
+      }
+    }
+
+    if (latestPredictionRef.current === id) setReasonsPending(false);
+  };
+
   // Submit prediction
   const handlePredict = async (e?: React.FormEvent) => {
     if (e) e.preventDefault();
@@ -80,6 +126,7 @@ export default function PredictionPage() {
           skills: skillString,
           qualification: degree,
           experience_level: experience,
+          explain: "deferred",
         }),
       });
 
@@ -89,13 +136,10 @@ export default function PredictionPage() {
       const results = data.predicted_role || [];
 
       setPredictionId(data.prediction_id);
+      latestPredictionRef.current = data.prediction_id;
       setFeedbackStatus("idle");
 
-      const formatted: RolePred[] = results.map((item: any) => ({
-        role: item.role,
-        confidence: Math.round(Number(item.confidence)),
-        reasons: Array.isArray(item.reasons) ? item.reasons : [],
-      }));
+      const formatted = formatResults(results);
 
       setPreds(formatted);
 
@@ -108,6 +152,13 @@ export default function PredictionPage() {
       };
 
       setHistory((prev) => [entry, ...prev]);
+
+      if (data.explanation_status === "PENDING") {
+        setReasonsPending(true);
+        pollExplanation(data.prediction_id, entry.id);
+      } else {
+        setReasonsPending(false);
+      }
     } catch (err: any) {
       setError(err.message || "Something went wrong");
     }
@@ -149,6 +200,8 @@ export default function PredictionPage() {
     setExperience("");
     setPreds(null);
     setError(null);
+    setReasonsPending(false);
+    latestPredictionRef.current = null;
   };
 
   const clearHistory = () => setHistory([]);
@@ -247,12 +300,18 @@ export default function PredictionPage() {
                     <div className="confBar">
                       <div className="confFill" style={{ width: `${p.confidence}%` }} />
                     </div>
-                    {p.reasons.length > 0 && (
+                    {p.reasons.length > 0 ? (
                       <ul className="reasons">
                         {p.reasons.map((r, i) => (
                           <li key={i}>{r}</li>
                         ))}
                       </ul>
+                    ) : (
+                      reasonsPending && (
+                        <ul className="reasons">
+                          <li>Analyzing why this role fits...</li>
+                        </ul>
+                      )
                     )}
                   </div>
                 ))
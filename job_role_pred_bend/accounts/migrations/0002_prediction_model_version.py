@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-17 19:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prediction',
+            name='model_version',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+    ]
@@ -133,6 +133,8 @@ class Prediction(models.Model):
     is_approved = models.BooleanField(default=False)
     is_flagged = models.BooleanField(default=False)
     approved_at = models.DateTimeField(null=True, blank=True)
+    # ML model version that produced this prediction
+    model_version = models.CharField(max_length=32, blank=True, default='')
 
     class Meta:
         db_table = 'prediction_history'
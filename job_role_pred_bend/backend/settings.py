@@ -193,7 +193,101 @@ GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 AUTH_USER_MODEL = 'accounts.Users'
 
 # ML model paths
+ML_MODEL_DIR = os.path.join(BASE_DIR, "ml","saved_models")
 ML_MODEL_PATH = os.path.join(BASE_DIR, "ml","saved_models","model.pkl")
 ML_ENCODER_PATH = os.path.join(BASE_DIR, "ml","saved_models","encoders.pkl")
 ML_METADATA_PATH = os.path.join(BASE_DIR, "ml","saved_models","metadata.json")
 
+# ML serving
+ML_BATCH_MAX_PROFILES = config("ML_BATCH_MAX_PROFILES", cast=int, default=1000)
+# reasons: full (exact SHAP) | fast (precomputed per-role tables) | none
+# Only fast/none run on the memory-mapped forest arrays; the first "full" explanation in a
+# process unpickles the sklearn forest and the SHAP explainer into it. Both defaults are "fast"
+# so web workers share the mapped bundle; "full" is still served when a request asks for it,
+# best with ML_INFERENCE_SOCKET so only the sidecar holds that copy.
+ML_EXPLAIN_DEFAULT = config("ML_EXPLAIN_DEFAULT", default="fast")
+# threads computing explain="deferred" reasons per worker process, and how: full | fast
+ML_EXPLAIN_WORKERS = config("ML_EXPLAIN_WORKERS", cast=int, default=2)
+ML_DEFERRED_EXPLAIN = config("ML_DEFERRED_EXPLAIN", default="fast")
+# prediction result cache: local (per-process LRU) | django (CACHES alias, shared) | off
+ML_RESULT_CACHE = config("ML_RESULT_CACHE", default="local")
+ML_RESULT_CACHE_ALIAS = config("ML_RESULT_CACHE_ALIAS", default="default")
+ML_RESULT_CACHE_SIZE = config("ML_RESULT_CACHE_SIZE", cast=int, default=10000)
+ML_RESULT_CACHE_TTL = config("ML_RESULT_CACHE_TTL", cast=int, default=3600)
+# micro-batching: concurrent single predictions wait up to MAX_WAIT_MS (or until MAX_SIZE
+# are queued) and are scored in one call; needs a threaded server to have anything to batch
+ML_MICROBATCH_ENABLED = config("ML_MICROBATCH_ENABLED", cast=bool, default=False)
+ML_MICROBATCH_MAX_SIZE = config("ML_MICROBATCH_MAX_SIZE", cast=int, default=32)
+ML_MICROBATCH_MAX_WAIT_MS = config("ML_MICROBATCH_MAX_WAIT_MS", cast=float, default=0.0)
+# Unix socket of the shared inference process (manage.py inference_server); empty = predict in-process.
+# Web workers fall back to in-process for RETRY_SECONDS after the socket fails. Batches are sent
+# MAX_PROFILES at a time and TIMEOUT applies per request, so keep MAX_PROFILES x the per-profile
+# cost of explain="full" (a few ms) well under it.
+ML_INFERENCE_SOCKET = config("ML_INFERENCE_SOCKET", default="")
+ML_INFERENCE_TIMEOUT = config("ML_INFERENCE_TIMEOUT", cast=float, default=5.0)
+ML_INFERENCE_MAX_PROFILES = config("ML_INFERENCE_MAX_PROFILES", cast=int, default=100)
+ML_INFERENCE_RETRY_SECONDS = config("ML_INFERENCE_RETRY_SECONDS", cast=float, default=5.0)
+# route predict/ and metadata/ to the async views (ml/async_views.py) when serving backend.asgi;
+# model calls run on at most ASYNC_PREDICT_WORKERS threads per process
+ML_ASYNC_VIEWS = config("ML_ASYNC_VIEWS", cast=bool, default=False)
+ML_ASYNC_PREDICT_WORKERS = config("ML_ASYNC_PREDICT_WORKERS", cast=int, default=4)
+# write-behind Prediction rows (PostgreSQL only): ids come from blocks of ID_BLOCK reserved sequence
+# values, rows are bulk-inserted every MAX_ROWS rows or MAX_WAIT_MS, and on worker exit
+ML_WRITE_BEHIND_ENABLED = config("ML_WRITE_BEHIND_ENABLED", cast=bool, default=False)
+ML_WRITE_BEHIND_MAX_ROWS = config("ML_WRITE_BEHIND_MAX_ROWS", cast=int, default=100)
+ML_WRITE_BEHIND_MAX_WAIT_MS = config("ML_WRITE_BEHIND_MAX_WAIT_MS", cast=float, default=200.0)
+ML_WRITE_BEHIND_ID_BLOCK = config("ML_WRITE_BEHIND_ID_BLOCK", cast=int, default=100)
+# admission control for predict: per-user token bucket of BURST requests refilled at RATE/s
+# (429 + Retry-After; 0 = off), and at most MAX_IN_FLIGHT predictions at once (0 = no limit) with
+# up to MAX_QUEUE more waiting QUEUE_TIMEOUT_MS for a slot before a 503. Buckets and slots are
+# flock'd files in SLOT_DIR, shared by all workers on the host; each host of a multi-host
+# deployment has its own.
+ML_PREDICT_RATE = config("ML_PREDICT_RATE", cast=float, default=0.0)
+ML_PREDICT_BURST = config("ML_PREDICT_BURST", cast=int, default=10)
+ML_PREDICT_MAX_IN_FLIGHT = config("ML_PREDICT_MAX_IN_FLIGHT", cast=int, default=0)
+ML_PREDICT_MAX_QUEUE = config("ML_PREDICT_MAX_QUEUE", cast=int, default=16)
+ML_PREDICT_QUEUE_TIMEOUT_MS = config("ML_PREDICT_QUEUE_TIMEOUT_MS", cast=float, default=500.0)
+ML_PREDICT_SLOT_DIR = os.path.join(BASE_DIR, "ml", "admission")
+# load + warm the model in MlConfig.ready(); also unpickle the SHAP explainer when FULL_EXPLAIN
+ML_WARMUP_ON_STARTUP = config("ML_WARMUP_ON_STARTUP", cast=bool, default=False)
+ML_WARMUP_FULL_EXPLAIN = config("ML_WARMUP_FULL_EXPLAIN", cast=bool, default=False)
+
+# ML training
+ML_ATTRIBUTION_SAMPLE_ROWS = config("ML_ATTRIBUTION_SAMPLE_ROWS", cast=int, default=200)
+# training CSVs are read this many rows at a time into an on-disk sparse feature store,
+# cached per dataset content hash; the KEEP most recently used stores are kept
+ML_TRAIN_CHUNK_ROWS = config("ML_TRAIN_CHUNK_ROWS", cast=int, default=50000)
+ML_FEATURE_STORE_DIR = os.path.join(BASE_DIR, "ml", "feature_store")
+ML_FEATURE_STORE_KEEP = config("ML_FEATURE_STORE_KEEP", cast=int, default=5)
+# uploaded datasets wait here until their background training job has run
+ML_TRAIN_UPLOAD_DIR = os.path.join(BASE_DIR, "ml", "uploads")
+# background training jobs heartbeat every HEARTBEAT_SECONDS; a queued/running job whose worker
+# has been silent for STALE_SECONDS (restart, redeploy) is marked FAILED
+ML_TRAIN_HEARTBEAT_SECONDS = config("ML_TRAIN_HEARTBEAT_SECONDS", cast=float, default=15.0)
+ML_TRAIN_STALE_SECONDS = config("ML_TRAIN_STALE_SECONDS", cast=float, default=120.0)
+# bounded skill feature space: drop skills in fewer than MIN_DF training rows, keep at most
+# MAX_FEATURES (0 = all) ranked by RANK ("frequency" | "mi"); or, with HASH_BUCKETS > 0,
+# hash every skill into that many columns instead of keeping a vocabulary
+ML_VOCAB_MIN_DF = config("ML_VOCAB_MIN_DF", cast=int, default=1)
+ML_VOCAB_MAX_FEATURES = config("ML_VOCAB_MAX_FEATURES", cast=int, default=0)
+ML_VOCAB_RANK = config("ML_VOCAB_RANK", default="frequency")
+ML_SKILL_HASH_BUCKETS = config("ML_SKILL_HASH_BUCKETS", cast=int, default=0)
+# collapse duplicate training rows into sample_weight counts before fitting
+ML_TRAIN_DEDUPLICATE = config("ML_TRAIN_DEDUPLICATE", cast=bool, default=True)
+# optional k-fold sweep over forest hyperparameters (ml.sweep.SWEEP_GRID) before the final fit;
+# picks the most accurate candidate whose single-row latency fits the budget (0 = no budget)
+ML_SWEEP_ENABLED = config("ML_SWEEP_ENABLED", cast=bool, default=False)
+ML_SWEEP_FOLDS = config("ML_SWEEP_FOLDS", cast=int, default=3)
+ML_SWEEP_LATENCY_BUDGET_MS = config("ML_SWEEP_LATENCY_BUDGET_MS", cast=float, default=0.0)
+# 0 = one process per core
+ML_SWEEP_WORKERS = config("ML_SWEEP_WORKERS", cast=int, default=0)
+# rows saved with each version: holdout for its evaluation report, per-role replay for incremental fits
+ML_HOLDOUT_ROWS = config("ML_HOLDOUT_ROWS", cast=int, default=5000)
+ML_REPLAY_ROWS_PER_ROLE = config("ML_REPLAY_ROWS_PER_ROLE", cast=int, default=50)
+# incremental retraining from approved feedback adds this many warm-started trees,
+# up to a total beyond which a full retrain is required
+ML_INCREMENTAL_TREES = config("ML_INCREMENTAL_TREES", cast=int, default=20)
+ML_INCREMENTAL_MAX_TREES = config("ML_INCREMENTAL_MAX_TREES", cast=int, default=300)
+# published model versions kept under ML_MODEL_DIR/versions
+ML_MODEL_KEEP_VERSIONS = config("ML_MODEL_KEEP_VERSIONS", cast=int, default=3)
+
@@ -0,0 +1,277 @@
+import os
+import json
+import time
+import zlib
+import threading
+from functools import wraps
+
+try:
+    import fcntl
+except ImportError:  # not on POSIX: no cross-process slots, the in-flight limit is off
+    fcntl = None
+
+from django.conf import settings
+from rest_framework.response import Response
+from rest_framework.throttling import BaseThrottle
+
+
+# Retry-After sent with 503s; a slot usually frees up within a prediction or two
+OVERLOAD_RETRY_AFTER = 1
+
+
+class TokenBuckets:
+    """
+    Token buckets shared by every worker process on this host.
+
+    Buckets are kept in `shards` small JSON files under bucket_dir, each
+    read-modify-written under an flock, so taking a token is atomic across
+    processes and threads (the same mechanism as AdmissionController's slots).
+    Buckets that have refilled completely are dropped whenever their shard is
+    rewritten. Without fcntl the buckets are this process's only.
+    """
+
+    def __init__(self, bucket_dir, shards=64):
+        self.bucket_dir = bucket_dir
+        self.shards = shards
+        self._lock = threading.Lock()
+        self._local = {}
+
+    def take(self, key, rate, burst, now=None):
+        """
+        Take one token from key's bucket. Returns 0.0 when taken, otherwise
+        the seconds until one is available.
+        """
+        now = time.time() if now is None else now
+
+        if fcntl is None:
+            with self._lock:
+                return self._take(self._local, key, rate, burst, now)
+
+        os.makedirs(self.bucket_dir, exist_ok=True)
+        shard = zlib.crc32(key.encode("utf-8")) % self.shards
+        path = os.path.join(self.bucket_dir, f"bucket-{shard}.json")
+
+        # a fresh open file per call: flock then excludes other threads too
+        with os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o600), "r+", encoding="utf-8") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                buckets = json.loads(f.read() or "{}")
+            except ValueError:
+                buckets = {}
+
+            wait = self._take(buckets, key, rate, burst, now)
+
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps(buckets))
+            f.flush()
+        return wait
+
+    @staticmethod
+    def _take(buckets, key, rate, burst, now):
+        for other, (tokens, updated) in list(buckets.items()):
+            if tokens + (now - updated) * rate >= burst:
+                del buckets[other]
+
+        tokens, updated = buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+
+        if tokens < 1:
+            return (1 - tokens) / rate
+
+        buckets[key] = [tokens - 1, now]
+        return 0.0
+
+
+# per-user predict buckets, next to the in-flight slot files
+rate_buckets = TokenBuckets(settings.ML_PREDICT_SLOT_DIR)
+
+
+class PredictRateThrottle(BaseThrottle):
+    """
+    Per-user token bucket for the predict endpoints.
+
+    Each user (or client IP when anonymous) gets ML_PREDICT_BURST tokens,
+    refilled at ML_PREDICT_RATE per second; a request takes one token or is
+    answered 429 with Retry-After. Buckets are shared by every worker process
+    on the host (see TokenBuckets). ML_PREDICT_RATE=0 turns it off.
+    """
+
+    def allow_request(self, request, view):
+        rate = settings.ML_PREDICT_RATE
+        if rate <= 0:
+            return True
+
+        if request.user and request.user.is_authenticated:
+            ident = f"user:{request.user.pk}"
+        else:
+            ident = f"ip:{self.get_ident(request)}"
+
+        self._wait = rate_buckets.take(ident, rate, settings.ML_PREDICT_BURST)
+        if self._wait:
+            admission.record_throttled()
+            return False
+        return True
+
+    def wait(self):
+        return self._wait
+
+
+class AdmissionController:
+    """
+    Bounds the predictions running at once across every worker process on
+    this host.
+
+    Slots are max_in_flight lock files under slot_dir, held with flock for
+    the duration of a request, so the bound covers sync gunicorn workers
+    (one request per process) as well as threaded and ASGI ones, and a slot
+    is released by the kernel when a worker dies. When all are taken, up to
+    max_queue more requests (also file slots) poll for at most
+    queue_timeout_ms; anything beyond that, or a wait that times out, is shed
+    right away so queued requests can't push the tail latency up without
+    bound. max_in_flight=0 admits everything (counting only), as does a
+    platform without fcntl.
+
+    The counters in stats() are this process's.
+    """
+
+    POLL_SECONDS = 0.005
+
+    def __init__(self, max_in_flight, max_queue, queue_timeout_ms, slot_dir):
+        self.max_in_flight = max_in_flight if fcntl is not None else 0
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout_ms / 1000
+
+        self._run_slots = [os.path.join(slot_dir, f"run-{i}.lock") for i in range(self.max_in_flight)]
+        self._queue_slots = [os.path.join(slot_dir, f"queue-{i}.lock") for i in range(max_queue)]
+        self.slot_dir = slot_dir
+
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.queued = 0
+
+        self.served = 0
+        self.throttled = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.max_in_flight_seen = 0
+
+    def _take(self, paths):
+        """
+        Open file descriptor holding the first free slot, or None.
+        """
+        os.makedirs(self.slot_dir, exist_ok=True)
+        for path in paths:
+            # a fresh open file per attempt: flock conflicts between open files,
+            # so threads of one process compete for slots like processes do
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            return fd
+        return None
+
+    @staticmethod
+    def _free(fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    def _count(self, field, delta):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + delta)
+            if field == "in_flight":
+                self.max_in_flight_seen = max(self.max_in_flight_seen, self.in_flight)
+
+    def acquire(self):
+        """
+        A slot token once admitted (pass it to release()), None when shed.
+        """
+        if not self.max_in_flight:
+            self._count("in_flight", 1)
+            return ADMITTED
+
+        slot = self._take(self._run_slots)
+        if slot is None:
+            queue_slot = self._take(self._queue_slots)
+            if queue_slot is None:
+                self._count("rejected_queue_full", 1)
+                return None
+
+            self._count("queued", 1)
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while slot is None:
+                    if time.monotonic() >= deadline:
+                        self._count("rejected_timeout", 1)
+                        return None
+                    time.sleep(self.POLL_SECONDS)
+                    slot = self._take(self._run_slots)
+            finally:
+                self._free(queue_slot)
+                self._count("queued", -1)
+
+        self._count("in_flight", 1)
+        return slot
+
+    def release(self, slot):
+        if slot is not ADMITTED:
+            self._free(slot)
+        with self._lock:
+            self.in_flight -= 1
+            self.served += 1
+
+    def record_throttled(self):
+        self._count("throttled", 1)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_in_flight": self.max_in_flight,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "queued": self.queued,
+                "served": self.served,
+                "throttled": self.throttled,
+                "rejected_queue_full": self.rejected_queue_full,
+                "rejected_timeout": self.rejected_timeout,
+                "max_in_flight_seen": self.max_in_flight_seen,
+            }
+
+
+# token for requests admitted without a slot (limit off)
+ADMITTED = object()
+
+# host-wide bound; the counters are per process
+admission = AdmissionController(
+    max_in_flight=settings.ML_PREDICT_MAX_IN_FLIGHT,
+    max_queue=settings.ML_PREDICT_MAX_QUEUE,
+    queue_timeout_ms=settings.ML_PREDICT_QUEUE_TIMEOUT_MS,
+    slot_dir=settings.ML_PREDICT_SLOT_DIR,
+)
+
+
+def overloaded_response():
+    return Response(
+        {"error": "Prediction service is busy, retry shortly"},
+        status=503,
+        headers={"Retry-After": str(OVERLOAD_RETRY_AFTER)},
+    )
+
+
+def admission_controlled(view):
+    """
+    Run a DRF function view under the in-flight limit (503 + Retry-After when shed).
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        slot = admission.acquire()
+        if slot is None:
+            return overloaded_response()
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            admission.release(slot)
+
+    return wrapper
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class MlConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ml'
+
+    def ready(self):
+        # Opt-in: load + warm the model at startup (once in the master with gunicorn --preload)
+        if settings.ML_WARMUP_ON_STARTUP:
+            from .warmup import warm_up
+            warm_up()
@@ -0,0 +1,380 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # not on POSIX: locks only hold within this process
+    fcntl = None
+
+import numpy as np
+from scipy import sparse
+from django.conf import settings
+
+from .forest import FlatForest
+
+
+# Layout under ML_MODEL_DIR:
+#   current.json              -> {"version": "<v>", "history": [..., "<v>"]}, flipped
+#                                atomically on publish / activate / rollback
+#   registry.lock             flock'd around every read-modify-write of current.json
+#   versions/<v>/manifest.json   feature columns, label tables, metrics, array index
+#   versions/<v>/*.npy           forest + attribution arrays, loaded with mmap_mode="r"
+#   versions/<v>/model.pkl       sklearn model + SHAP explainer, only for explain="full"
+#   versions/<v>/metadata.json   dropdown metadata for the frontend
+#   versions/<v>/report.json     holdout evaluation report
+#   versions/<v>/samples/        holdout + per-role replay rows for incremental retraining
+MODEL_DIR = settings.ML_MODEL_DIR
+VERSIONS_DIR = os.path.join(MODEL_DIR, "versions")
+CURRENT_PATH = os.path.join(MODEL_DIR, "current.json")
+
+MANIFEST_NAME = "manifest.json"
+PICKLE_NAME = "model.pkl"
+METADATA_NAME = "metadata.json"
+REPORT_NAME = "report.json"
+SAMPLES_DIR = "samples"
+
+# activations remembered in current.json for rollback
+HISTORY_LIMIT = 20
+
+REGISTRY_LOCK_NAME = "registry.lock"
+
+
+def atomic_write(path, data):
+    """
+    Write bytes to path via a temp file + rename so readers never see a partial file.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+_process_locks = {}
+_process_locks_guard = threading.Lock()
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Exclusive flock on path for the duration of the block; blocks until it is free.
+
+    Every call opens the file anew, so threads of one process exclude each
+    other the same way worker processes do.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    if fcntl is None:
+        with _process_locks_guard:
+            lock = _process_locks.setdefault(path, threading.Lock())
+        with lock:
+            yield
+        return
+
+    with open(path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def registry_lock():
+    """
+    Serializes the read-modify-write of current.json (publish, activate, rollback).
+    """
+    return file_lock(os.path.join(MODEL_DIR, REGISTRY_LOCK_NAME))
+
+
+def content_version(payload):
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+def version_dir(version):
+    return os.path.join(VERSIONS_DIR, version)
+
+
+def _write_bundle(path, artifacts, payload, metadata, metrics, report, samples, version):
+    os.makedirs(path)
+
+    forest = FlatForest.from_sklearn(artifacts["model"])
+    arrays = {f"forest_{name}": arr for name, arr in forest.to_arrays().items()}
+
+    attributions = artifacts.get("attributions")
+    if attributions is not None:
+        arrays.update({f"attr_{name}": arr for name, arr in attributions.items()})
+
+    for name, arr in arrays.items():
+        np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(arr))
+
+    enc = artifacts["encoders"]
+    manifest = {
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "metrics": metrics or {},
+        "feature_cols": artifacts["feature_cols"],
+        # how skills map to feature columns: {"mode": "vocab"} or {"mode": "hash", "buckets": n}
+        "skill_encoding": artifacts.get("skill_encoding", {"mode": "vocab"}),
+        "labels": {
+            field: [str(label) for label in enc[field].classes_]
+            for field in ("qualification", "experience_level", "job_role")
+        },
+        "forest": {
+            "max_depth": forest.max_depth,
+            "classes": forest.classes_.tolist(),
+        },
+        "arrays": sorted(arrays),
+    }
+
+    with open(os.path.join(path, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    with open(os.path.join(path, PICKLE_NAME), "wb") as f:
+        f.write(payload)
+
+    with open(os.path.join(path, METADATA_NAME), "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+
+    if report is not None:
+        with open(os.path.join(path, REPORT_NAME), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if samples:
+        os.makedirs(os.path.join(path, SAMPLES_DIR))
+        for name, (X, y) in samples.items():
+            sparse.save_npz(os.path.join(path, SAMPLES_DIR, f"{name}_X.npz"), sparse.csr_matrix(X))
+            np.save(os.path.join(path, SAMPLES_DIR, f"{name}_y.npy"), np.asarray(y))
+
+
+def publish_model(artifacts, payload, metadata, metrics=None, report=None, samples=None):
+    """
+    Write a complete version bundle, then make it the active version.
+
+    The bundle is built in a temp dir and renamed into place, so a version
+    directory is either complete or absent. Returns the version.
+    """
+    version = content_version(payload)
+    final_path = version_dir(version)
+
+    if not os.path.exists(final_path):
+        os.makedirs(VERSIONS_DIR, exist_ok=True)
+        tmp_path = os.path.join(VERSIONS_DIR, f".{version}.{os.getpid()}.tmp")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        _write_bundle(tmp_path, artifacts, payload, metadata, metrics, report, samples, version)
+        try:
+            os.rename(tmp_path, final_path)
+        except OSError:
+            # same content published concurrently
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    activate_version(version)
+    return version
+
+
+def read_current():
+    """
+    The pointer file as a dict, or None before the first publish.
+    """
+    try:
+        with open(CURRENT_PATH, "r", encoding="utf-8") as f:
+            current = json.load(f)
+    except FileNotFoundError:
+        return None
+
+    current.setdefault("history", [current["version"]])
+    return current
+
+
+def _point_to(version, history):
+    # metadata first: once current.json flips, the new version must be fully visible
+    with open(os.path.join(version_dir(version), METADATA_NAME), "rb") as f:
+        atomic_write(settings.ML_METADATA_PATH, f.read())
+
+    atomic_write(
+        CURRENT_PATH,
+        json.dumps({"version": version, "history": history[-HISTORY_LIMIT:]}).encode("utf-8"),
+    )
+
+    # never prune what serving points at or what a rollback would return to
+    prune_versions(keep=settings.ML_MODEL_KEEP_VERSIONS, protect=set(history[-2:]))
+
+
+def activate_version(version):
+    """
+    Serve an existing version; every worker picks it up on its next request.
+    """
+    # temp bundles and path tricks ("..") are not versions
+    if version.startswith(".") or not os.path.isdir(version_dir(version)):
+        raise FileNotFoundError(f"Unknown model version '{version}'")
+
+    with registry_lock():
+        current = read_current()
+        history = current["history"] if current else []
+        if not history or history[-1] != version:
+            history.append(version)
+
+        _point_to(version, history)
+    return version
+
+
+def rollback_version():
+    """
+    Go back to the version that was active before the current one.
+    """
+    with registry_lock():
+        current = read_current()
+        history = current["history"][:-1] if current else []
+
+        # versions removed since they were active can't be restored
+        while history and not os.path.isdir(version_dir(history[-1])):
+            history.pop()
+
+        if not history:
+            raise ValueError("No previous model version to roll back to")
+
+        _point_to(history[-1], history)
+    return history[-1]
+
+
+def list_versions():
+    """
+    Published versions, newest first, with their manifest summary.
+    """
+    if not os.path.isdir(VERSIONS_DIR):
+        return []
+
+    current = read_current()
+    active = current["version"] if current else None
+    versions = []
+
+    for entry in os.scandir(VERSIONS_DIR):
+        if not entry.is_dir() or entry.name.startswith("."):
+            continue
+        try:
+            with open(os.path.join(entry.path, MANIFEST_NAME), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            continue
+
+        versions.append({
+            "version": entry.name,
+            "active": entry.name == active,
+            "created_at": manifest.get("created_at"),
+            "metrics": manifest.get("metrics", {}),
+            "n_features": len(manifest["feature_cols"]),
+            "roles": len(manifest["labels"]["job_role"]),
+            "size_bytes": sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file()),
+        })
+
+    versions.sort(key=lambda v: v["created_at"] or "", reverse=True)
+    return versions
+
+
+def prune_versions(keep, protect=()):
+    """
+    Remove all but the newest `keep` version bundles.
+
+    Workers may still have old arrays mapped; on POSIX the pages stay valid
+    after unlink, elsewhere removal can fail and is retried on the next publish.
+    """
+    if not os.path.isdir(VERSIONS_DIR):
+        return
+
+    bundles = [
+        entry for entry in os.scandir(VERSIONS_DIR)
+        if entry.is_dir() and not entry.name.startswith(".")
+    ]
+    bundles.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+
+    for entry in bundles[keep:]:
+        if entry.name not in protect:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def read_current_version():
+    current = read_current()
+    if current is None:
+        raise FileNotFoundError("Model not trained yet.")
+    return current["version"]
+
+
+def load_bundle(version):
+    """
+    Open a version bundle for serving.
+
+    Arrays are memory-mapped read-only so every worker shares the same pages
+    through the OS page cache; the sklearn pickle is not touched here.
+    """
+    path = version_dir(version)
+    manifest = read_manifest(version)
+
+    arrays = {
+        name: np.asarray(np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r"))
+        for name in manifest["arrays"]
+    }
+
+    forest = FlatForest.from_arrays(
+        {
+            name[len("forest_"):]: arr
+            for name, arr in arrays.items()
+            if name.startswith("forest_")
+        },
+        max_depth=manifest["forest"]["max_depth"],
+        classes=np.asarray(manifest["forest"]["classes"]),
+    )
+
+    attributions = {
+        name[len("attr_"):]: arr
+        for name, arr in arrays.items()
+        if name.startswith("attr_")
+    } or None
+
+    return manifest, forest, attributions, os.path.join(path, PICKLE_NAME)
+
+
+def _read_json(version, name):
+    with open(os.path.join(version_dir(version), name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_manifest(version):
+    return _read_json(version, MANIFEST_NAME)
+
+
+def read_metadata(version):
+    return _read_json(version, METADATA_NAME)
+
+
+def read_report(version):
+    """
+    Evaluation report of a version, or None for versions published without one.
+    """
+    try:
+        return _read_json(version, REPORT_NAME)
+    except FileNotFoundError:
+        return None
+
+
+def load_samples(version):
+    """
+    {name: (X csr, y)} saved with a version; empty for versions without samples.
+    """
+    samples_path = os.path.join(version_dir(version), SAMPLES_DIR)
+    if not os.path.isdir(samples_path):
+        return {}
+
+    samples = {}
+    for entry in os.scandir(samples_path):
+        if entry.name.endswith("_X.npz"):
+            name = entry.name[:-len("_X.npz")]
+            samples[name] = (
+                sparse.load_npz(entry.path).tocsr(),
+                np.load(os.path.join(samples_path, f"{name}_y.npy")),
+            )
+    return samples
@@ -0,0 +1,153 @@
+import math
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework.exceptions import APIException, AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from accounts.models import Prediction
+
+from .admission import OVERLOAD_RETRY_AFTER, PredictRateThrottle, admission
+from .models import PredictionExplanation
+from .tasks import submit_explanation
+from .views import (
+    buffer_prediction, explanation_inputs, prediction_fields, predict_inputs,
+    predict_payload, read_metadata, score_inputs,
+)
+from .writebehind import prediction_writer
+
+# Async versions of predict_view and metadata_view, routed instead of the DRF
+# views when ML_ASYNC_VIEWS is on and the app is served through backend.asgi.
+# DRF function views are sync only, so these authenticate and answer with
+# plain Django; validation, rows and payloads come from the helpers in
+# ml/views.py, so request and response bodies are the same.
+
+# Bounded pool for model calls: the event loop keeps accepting requests while
+# at most ML_ASYNC_PREDICT_WORKERS predictions run at once
+_predict_executor = ThreadPoolExecutor(
+    max_workers=settings.ML_ASYNC_PREDICT_WORKERS,
+    thread_name_prefix="ml-predict",
+)
+
+_jwt = JWTAuthentication()
+
+
+async def _authenticate(request):
+    """
+    (user, None) for a valid bearer token, else (None, 401 response).
+    """
+    try:
+        result = await sync_to_async(_jwt.authenticate)(request)
+    except AuthenticationFailed as exc:
+        # same body DRF renders (InvalidToken carries a dict)
+        body = exc.detail if isinstance(exc.detail, dict) else {"detail": exc.detail}
+        return None, _unauthorized(request, body)
+
+    if result is None:
+        return None, _unauthorized(request, {"detail": "Authentication credentials were not provided."})
+    return result[0], None
+
+
+def _unauthorized(request, body):
+    response = JsonResponse(body, status=401)
+    response["WWW-Authenticate"] = _jwt.authenticate_header(request)
+    return response
+
+
+# --- PREDICT (PUBLIC) ---
+@csrf_exempt
+@require_POST
+async def predict_view(request):
+    user, denied = await _authenticate(request)
+    if denied:
+        return denied
+
+    # same admission control as the DRF view: per-user bucket, then in-flight limit
+    request.user = user
+    throttle = PredictRateThrottle()
+    if not await sync_to_async(throttle.allow_request)(request, None):
+        wait = math.ceil(throttle.wait())
+        response = JsonResponse({"detail": f"Request was throttled. Expected available in {wait} seconds."}, status=429)
+        response["Retry-After"] = str(wait)
+        return response
+
+    # may poll for a queued slot: off the event loop
+    slot = await sync_to_async(admission.acquire, thread_sensitive=False)()
+    if slot is None:
+        response = JsonResponse({"error": "Prediction service is busy, retry shortly"}, status=503)
+        response["Retry-After"] = str(OVERLOAD_RETRY_AFTER)
+        return response
+
+    try:
+        return await _predict(request, user)
+    finally:
+        admission.release(slot)
+
+
+def _parse_body(request):
+    """
+    Request body through DRF's parsers, as (data, None) or (None, error response):
+    JSON, form and multipart bodies parse as they do for the DRF view.
+    """
+    try:
+        return Request(request, parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES]).data, None
+    except APIException as exc:
+        # ParseError / UnsupportedMediaType, with DRF's body and status
+        return None, JsonResponse({"detail": exc.detail}, status=exc.status_code)
+
+
+async def _predict(request, user):
+    # multipart parsing may spool uploads to disk: off the event loop
+    data, error = await sync_to_async(_parse_body, thread_sensitive=False)(request)
+    if error:
+        return error
+
+    inputs, error = predict_inputs(data)
+    if error:
+        return JsonResponse(error[0], status=error[1])
+
+    scored, error = await asyncio.get_running_loop().run_in_executor(
+        _predict_executor, score_inputs, inputs
+    )
+    if error:
+        return JsonResponse(error[0], status=error[1])
+    job, version = scored
+
+    fields, error = prediction_fields(user, inputs, job, version)
+    if error:
+        return JsonResponse(error[0], status=error[1])
+
+    if buffer_prediction(inputs):
+        # may reserve a new block of ids from the database
+        prediction = await sync_to_async(prediction_writer.add)(**fields)
+    else:
+        prediction = await Prediction.objects.acreate(**fields)
+
+    explanation = None
+    if inputs["deferred"]:
+        explanation = await PredictionExplanation.objects.acreate(
+            prediction=prediction, inputs=explanation_inputs(inputs)
+        )
+        # autocommit: the row is already visible to the worker
+        submit_explanation(explanation)
+
+    return JsonResponse(predict_payload(prediction, job, explanation))
+
+
+# -----------------------------
+# Metadata View (Public)
+@require_GET
+async def metadata_view(request):
+    data = await sync_to_async(read_metadata, thread_sensitive=False)()
+
+    if data is None:
+        return JsonResponse({"error": "Metadata not found"}, status=404)
+
+    return JsonResponse(data)
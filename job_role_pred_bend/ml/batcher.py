@@ -0,0 +1,137 @@
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+
+# batch size histogram buckets (upper bounds) for stats()
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-profile predictions into one model call.
+
+    Callers block in submit() while a worker thread collects requests for up
+    to max_wait_ms after the first one (or until max_batch are waiting),
+    runs handler(profiles, explain=..., with_version=True) once per explain
+    mode, and hands each caller its own result. Only helps when a process
+    serves requests on several threads (gthread workers, ASGI).
+    """
+
+    def __init__(self, handler, max_batch, max_wait_ms):
+        self.handler = handler
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._worker = None
+
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.size_histogram = {bound: 0 for bound in SIZE_BUCKETS}
+        self.size_histogram["more"] = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.max_wait_seen = 0.0
+
+    def submit(self, profile, explain):
+        """
+        Score one profile; returns (result, model_version).
+        """
+        future = Future()
+
+        with self._cond:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="ml-microbatch", daemon=True
+                )
+                self._worker.start()
+
+            self._queue.append((profile, explain, time.monotonic(), future))
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+            self._cond.notify()
+
+        return future.result()
+
+    def _take_batch(self):
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+
+            # the window starts when the oldest request arrived
+            deadline = self._queue[0][2] + self.max_wait
+            while len(self._queue) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            n = min(len(self._queue), self.max_batch)
+            return [self._queue.popleft() for _ in range(n)]
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            self._record(batch)
+
+            by_explain = {}
+            for item in batch:
+                by_explain.setdefault(item[1], []).append(item)
+
+            for explain, items in by_explain.items():
+                self._score(explain, items)
+
+    def _score(self, explain, items):
+        try:
+            results, version = self.handler(
+                [profile for profile, *_ in items], explain=explain, with_version=True
+            )
+        except Exception as exc:
+            if len(items) == 1:
+                items[0][3].set_exception(exc)
+                return
+            # one bad profile (e.g. unseen qualification) must not fail the others
+            for item in items:
+                self._score(explain, [item])
+            return
+
+        for (_, _, _, future), result in zip(items, results):
+            future.set_result((result, version))
+
+    def _record(self, batch):
+        now = time.monotonic()
+        waits = [now - enqueued for _, _, enqueued, _ in batch]
+
+        with self._stats_lock:
+            self.requests += len(batch)
+            self.batches += 1
+            self.total_wait += sum(waits)
+            self.max_wait_seen = max(self.max_wait_seen, max(waits))
+
+            for bound in SIZE_BUCKETS:
+                if len(batch) <= bound:
+                    self.size_histogram[bound] += 1
+                    break
+            else:
+                self.size_histogram["more"] += 1
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000,
+                "requests": self.requests,
+                "batches": self.batches,
+                "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+                "batch_size_histogram": {
+                    (f"<={bound}" if bound != "more" else f">{SIZE_BUCKETS[-1]}"): count
+                    for bound, count in self.size_histogram.items()
+                },
+                "queue_depth": len(self._queue),
+                "max_queue_depth": self.max_queue_depth,
+                "avg_wait_ms": round(self.total_wait * 1000 / self.requests, 3) if self.requests else 0.0,
+                "max_wait_ms_seen": round(self.max_wait_seen * 1000, 3),
+            }
@@ -0,0 +1,152 @@
+import numpy as np
+
+from .vocab import hash_bucket
+
+
+def normalize_skills(skills):
+    """
+    skills can be a list (from dash_prediction_data) or a comma-separated string (from JSON)
+    """
+    if isinstance(skills, list):
+        return [
+            s.strip().lower()
+            for s in skills
+            if isinstance(s, str) and s.strip()
+        ]
+
+    return [
+        s.strip().lower()
+        for s in str(skills).split(",")
+        if s.strip()
+    ]
+
+
+class FeatureEncoder:
+    """
+    Precompiled encoder for one model version.
+
+    Holds a skill -> column index map and dict lookup tables for the
+    categorical encoders, so profiles are written straight into a float32
+    NumPy matrix without building a DataFrame or calling LabelEncoder.
+
+    With hash_buckets the skill columns are "skill__#<bucket>" and every
+    skill, seen in training or not, is hashed into one of them.
+    """
+
+    SKILL_PREFIX = "skill__"
+
+    def __init__(self, feature_cols, qual_labels, exp_labels, role_labels, hash_buckets=0):
+        self.feature_cols = list(feature_cols)
+        self.n_features = len(self.feature_cols)
+
+        self.qual_col = self.feature_cols.index("qualification")
+        self.exp_col = self.feature_cols.index("experience_level")
+
+        self.hash_buckets = hash_buckets
+        if hash_buckets:
+            self.hash_offset = self.feature_cols.index(f"{self.SKILL_PREFIX}#0")
+            self.skill_index = {}
+        else:
+            prefix_len = len(self.SKILL_PREFIX)
+            self.skill_index = {
+                col[prefix_len:]: j
+                for j, col in enumerate(self.feature_cols)
+                if col.startswith(self.SKILL_PREFIX)
+            }
+
+        self.qual_labels = list(qual_labels)
+        self.exp_labels = list(exp_labels)
+        self.role_labels = list(role_labels)
+        self.qual_codes = {label: code for code, label in enumerate(self.qual_labels)}
+        self.exp_codes = {label: code for code, label in enumerate(self.exp_labels)}
+
+    @classmethod
+    def from_encoders(cls, feature_cols, encoders):
+        """
+        Build from the fitted LabelEncoders stored in the training artifacts.
+        """
+        return cls(
+            feature_cols,
+            encoders["qualification"].classes_,
+            encoders["experience_level"].classes_,
+            encoders["job_role"].classes_,
+        )
+
+    @staticmethod
+    def _lookup(table, value, field):
+        # unseen label -> "other", same fallback the LabelEncoder path used
+        code = table.get(value)
+        if code is None:
+            code = table.get("other")
+        if code is None:
+            raise ValueError(f"Unseen {field} '{value}' and no 'other' category")
+        return code
+
+    def parse(self, profile):
+        """
+        Normalize one profile into (skills, qualification code, experience code).
+        """
+        skills = normalize_skills(profile["skills"])
+        qual = str(profile["qualification"]).strip().lower()
+        exp = str(profile["experience_level"]).strip().lower()
+
+        return (
+            skills,
+            self._lookup(self.qual_codes, qual, "qualification"),
+            self._lookup(self.exp_codes, exp, "experience_level"),
+        )
+
+    def skill_columns(self, skills):
+        """
+        Column indices of the in-vocabulary skills; unknown skills are ignored.
+        """
+        if self.hash_buckets:
+            return [self.hash_offset + hash_bucket(s, self.hash_buckets) for s in skills]
+        return [j for j in map(self.skill_index.get, skills) if j is not None]
+
+    def cache_skills(self, skills):
+        """
+        What the result cache keys a profile's skills by: the in-vocabulary
+        columns, or with hash_buckets the skill names themselves - colliding
+        skills share a column but not the reasons that name them.
+        """
+        if self.hash_buckets:
+            return skills
+        return self.skill_columns(skills)
+
+    def skill_feature_names(self, skills):
+        """
+        {feature column: input skill} for the reason builder; skills sharing a
+        hashed bucket are joined with "/".
+        """
+        names = {}
+        for skill in dict.fromkeys(skills):
+            for j in self.skill_columns([skill]):
+                col = self.feature_cols[j]
+                names[col] = f"{names[col]}/{skill}" if col in names else skill
+        return names
+
+    def encode_parsed(self, parsed, out=None):
+        """
+        Write parsed profiles into a (n, n_features) float32 matrix.
+
+        out can be a preallocated matrix to reuse; it is zeroed first.
+        """
+        if out is None:
+            out = np.zeros((len(parsed), self.n_features), dtype=np.float32)
+        else:
+            out[:len(parsed)] = 0
+
+        for row, (skills, qual_code, exp_code) in enumerate(parsed):
+            out[row, self.qual_col] = qual_code
+            out[row, self.exp_col] = exp_code
+            out[row, self.skill_columns(skills)] = 1
+
+        return out
+
+    def encode(self, profiles, out=None):
+        """
+        Encode profile dicts. Returns (X, parsed) - the reason builder needs parsed.
+        """
+        parsed = [self.parse(p) for p in profiles]
+        return self.encode_parsed(parsed, out), parsed
@@ -0,0 +1,70 @@
+import time
+
+import numpy as np
+from sklearn.metrics import confusion_matrix, precision_recall_fscore_support
+
+from .sweep import single_row_latency_ms
+
+
+BLOCK_ROWS = 10000
+
+
+def _dense(X):
+    return X.toarray() if hasattr(X, "toarray") else np.asarray(X)
+
+
+def evaluation_report(forest, X_test, y_test, role_labels, fit_seconds):
+    """
+    Holdout evaluation of a trained forest, computed once at training time.
+
+    forest is the FlatForest that will serve the model, so the timings are
+    the ones predict_job_roles actually pays.
+    """
+    codes = np.arange(len(role_labels))
+    first_row = _dense(X_test[:1])
+
+    forest.predict_proba(first_row)  # JIT / first-touch outside the timing
+
+    # densify block by block: a sparse holdout set can be far larger as a dense matrix
+    probs = []
+    batch_seconds = 0.0
+    for start in range(0, X_test.shape[0], BLOCK_ROWS):
+        block = _dense(X_test[start:start + BLOCK_ROWS])
+        started = time.perf_counter()
+        probs.append(forest.predict_proba(block))
+        batch_seconds += time.perf_counter() - started
+    probs = np.vstack(probs)
+
+    classes = np.asarray(forest.classes_)
+    y_pred = classes[probs.argmax(axis=1)]
+    top3 = classes[np.argsort(probs, axis=1)[:, -3:]]
+
+    precision, recall, f1, support = precision_recall_fscore_support(
+        y_test, y_pred, labels=codes, zero_division=0
+    )
+
+    return {
+        "test_rows": int(len(y_test)),
+        "accuracy": round(float(np.mean(y_pred == y_test)), 4),
+        "top3_accuracy": round(float(np.mean((top3 == y_test[:, np.newaxis]).any(axis=1))), 4),
+        "per_role": [
+            {
+                "role": role_labels[code],
+                "precision": round(float(precision[code]), 4),
+                "recall": round(float(recall[code]), 4),
+                "f1": round(float(f1[code]), 4),
+                "support": int(support[code]),
+            }
+            for code in codes
+        ],
+        # rows: true role, columns: predicted role, both in "labels" order
+        "confusion_matrix": {
+            "labels": list(role_labels),
+            "matrix": confusion_matrix(y_test, y_pred, labels=codes).tolist(),
+        },
+        "timing": {
+            "fit_seconds": round(fit_seconds, 2),
+            "batch_ms_per_row": round(batch_seconds * 1000 / max(len(y_test), 1), 4),
+            "single_row_ms": round(single_row_latency_ms(forest, first_row), 4),
+        },
+    }
@@ -0,0 +1,132 @@
+import numpy as np
+
+
+EXPLAIN_MODES = ("full", "fast", "none")
+
+
+def shap_contributions(shap_values, row, class_idx):
+    """
+    SHAP contributions of one row towards one class.
+
+    shap_values can be:
+    - list of arrays (one per class), each (n_samples, n_features)
+    - single array (n_samples, n_features) - same SHAP vector for all roles
+    - array (n_samples, n_features, n_classes)
+    """
+    if isinstance(shap_values, list):
+        return shap_values[class_idx][row]
+
+    sv = np.asarray(shap_values)
+    if sv.ndim == 2:
+        return sv[row]
+    if sv.ndim == 3:
+        return sv[row, :, class_idx]
+    raise ValueError(f"Unexpected shap_values shape: {sv.shape}")
+
+
+def build_reasons(feature_cols, contribs, input_skills, qual_label, exp_label, role_name):
+    """
+    Turn one role's feature contributions into the reason strings shown on the roleCard.
+
+    input_skills maps the skill feature columns the profile set to the skill
+    names to show (FeatureEncoder.skill_feature_names).
+    """
+    feature_importance = list(zip(feature_cols, contribs))
+
+    # Sort by strongest positive influence
+    feature_importance.sort(key=lambda x: abs(x[1]), reverse=True)
+
+    skill_reasons = []
+    edu_exp_reasons = []
+
+    for feat, value in feature_importance[:15]:   # look at top influences
+        # skills: only consider input skills
+        if feat.startswith("skill__") and value > 0 and feat in input_skills:
+            skill_name = input_skills[feat]
+            skill_reasons.append(f"{skill_name} aligned strongly with {role_name}")
+
+        # qualification
+        elif feat == "qualification" and value > 0:
+            edu_exp_reasons.append(
+                f"Profiles with '{qual_label}' frequently match {role_name}"
+            )
+
+        # experience
+        elif feat == "experience_level" and value > 0:
+            edu_exp_reasons.append(
+                f"Experience level '{exp_label}' is common among {role_name}s"
+            )
+
+        # stop once we have enough explanations
+        if len(skill_reasons) >= 3 and len(edu_exp_reasons) >= 2:
+            break
+
+    # fallbacks if nothing positive appeared
+    if not skill_reasons:
+        skill_reasons.append("No direct skill signals — inferred from broader pattern")
+
+    if not edu_exp_reasons:
+        edu_exp_reasons.append("Education/experience pattern inferred from model")
+
+    return skill_reasons + edu_exp_reasons
+
+
+def shap_by_class(shap_values, n_classes):
+    """
+    Normalize any shap_values layout to one (n_classes, n_samples, n_features) array.
+    """
+    if isinstance(shap_values, list):
+        return np.stack([np.asarray(sv) for sv in shap_values])
+
+    sv = np.asarray(shap_values)
+    if sv.ndim == 2:
+        return np.repeat(sv[np.newaxis], n_classes, axis=0)
+    if sv.ndim == 3:
+        return np.moveaxis(sv, 2, 0)
+    raise ValueError(f"Unexpected shap_values shape: {sv.shape}")
+
+
+def build_role_attributions(explainer, X, n_classes, qual_col, exp_col, n_qual, n_exp):
+    """
+    Precompute per-role attribution tables from exact SHAP on a training sample.
+
+    - features: (n_classes, n_features) mean contribution of each skill column
+      over the rows where that skill is present
+    - qualification / experience_level: (n_classes, n_categories) mean
+      contribution of the categorical column over rows with that category
+
+    Missing combinations are 0, i.e. never produce a reason.
+    """
+    X = np.asarray(X)
+    sv = shap_by_class(explainer.shap_values(X), n_classes)
+
+    present = (X != 0).astype(np.float64)
+    counts = present.sum(axis=0)
+    features = np.einsum("cnf,nf->cf", sv, present) / np.maximum(counts, 1)
+
+    def category_table(col, n_categories):
+        codes = X[:, col].astype(int)
+        table = np.zeros((n_classes, n_categories))
+        for code in np.unique(codes):
+            rows = codes == code
+            table[:, code] = sv[:, rows, col].mean(axis=1)
+        return table
+
+    return {
+        "features": features,
+        "qualification": category_table(qual_col, n_qual),
+        "experience_level": category_table(exp_col, n_exp),
+    }
+
+
+def fast_contributions(attributions, x, class_idx, qual_col, exp_col, qual_code, exp_code):
+    """
+    Approximate one row's contributions towards one class by table lookup.
+
+    Present skills get the role's precomputed attribution, absent ones 0;
+    the categorical columns use the entry for the row's category.
+    """
+    contribs = attributions["features"][class_idx] * (x != 0)
+    contribs[qual_col] = attributions["qualification"][class_idx, qual_code]
+    contribs[exp_col] = attributions["experience_level"][class_idx, exp_code]
+    return contribs
@@ -0,0 +1,145 @@
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional, the NumPy path gives the same numbers
+    njit = None
+
+
+class FlatForest:
+    """
+    A fitted RandomForestClassifier exported into contiguous node arrays.
+
+    All trees share one set of arrays; roots[t] is the first node of tree t.
+    Leaves point to themselves (left == right == node), so a leaf is the
+    node where traversal stops. value holds per-node class probabilities,
+    normalized exactly the way sklearn's tree predict_proba does, so results
+    match RandomForestClassifier.predict_proba bit for bit.
+    """
+
+    ARRAY_NAMES = ("feature", "threshold", "left", "right", "value", "roots")
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, classes):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+
+    @classmethod
+    def from_sklearn(cls, model):
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        max_depth = 0
+        offset = 0
+
+        for est in model.estimators_:
+            tree = est.tree_
+            n = tree.node_count
+            node_ids = np.arange(n, dtype=np.int32)
+            is_leaf = tree.children_left == -1
+
+            left = np.where(is_leaf, node_ids, tree.children_left).astype(np.int32)
+            right = np.where(is_leaf, node_ids, tree.children_right).astype(np.int32)
+
+            proba = tree.value[:, 0, :].astype(np.float64)
+            normalizer = proba.sum(axis=1)
+            normalizer[normalizer == 0.0] = 1.0
+            proba /= normalizer[:, np.newaxis]
+
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(tree.threshold.astype(np.float64))
+            lefts.append(left + offset)
+            rights.append(right + offset)
+            values.append(proba)
+            roots.append(offset)
+
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            value=np.ascontiguousarray(np.concatenate(values)),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+            classes=np.asarray(model.classes_),
+        )
+
+    def to_arrays(self):
+        return {name: getattr(self, name) for name in self.ARRAY_NAMES}
+
+    @classmethod
+    def from_arrays(cls, arrays, max_depth, classes):
+        """
+        Rebuild from saved arrays (possibly read-only memory maps).
+        """
+        return cls(
+            **{name: arrays[name] for name in cls.ARRAY_NAMES},
+            max_depth=max_depth,
+            classes=classes,
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def predict_proba(self, X):
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if _predict_proba_numba is not None:
+            out = np.zeros((X.shape[0], self.value.shape[1]), dtype=np.float64)
+            _predict_proba_numba(
+                X, self.feature, self.threshold, self.left, self.right,
+                self.value, self.roots, out,
+            )
+            return out
+        return self.predict_proba_numpy(X)
+
+    def predict_proba_numpy(self, X):
+        """
+        Vectorized traversal: every (row, tree) pair steps one level per iteration.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows = X.shape[0]
+
+        nodes = np.repeat(self.roots[np.newaxis, :], n_rows, axis=0)
+        rows = np.arange(n_rows)[:, np.newaxis]
+
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        # accumulate tree by tree, in order, like sklearn does
+        out = np.zeros((n_rows, self.value.shape[1]), dtype=np.float64)
+        for t in range(self.n_trees):
+            out += self.value[nodes[:, t]]
+        out /= self.n_trees
+        return out
+
+
+if njit is not None:
+    @njit(cache=True, nogil=True)
+    def _predict_proba_numba(X, feature, threshold, left, right, value, roots, out):
+        n_classes = value.shape[1]
+
+        for i in range(X.shape[0]):
+            for t in range(roots.shape[0]):
+                node = roots[t]
+                while left[node] != node:
+                    if X[i, feature[node]] <= threshold[node]:
+                        node = left[node]
+                    else:
+                        node = right[node]
+
+                for c in range(n_classes):
+                    out[i, c] += value[node, c]
+
+            for c in range(n_classes):
+                out[i, c] /= roots.shape[0]
+else:
+    _predict_proba_numba = None
@@ -0,0 +1,151 @@
+import pickle
+import time
+
+import numpy as np
+from scipy import sparse
+from django.conf import settings
+from django.utils import timezone
+
+from accounts.models import Prediction, Skill, Education
+
+from .artifacts import load_samples, read_manifest, read_metadata
+from .predict import load_artifacts
+from .train import publish_trained_model, replay_sample
+
+
+# experience is not stored with a prediction; same default as dash_prediction_data
+FEEDBACK_DEFAULT_EXPERIENCE = "entry"
+
+
+def feedback_profiles(since=None):
+    """
+    Approved predictions as labelled profiles, joined with the user's
+    Skill/Education rows. Returns ([(profile, role), ...], latest approved_at).
+
+    Skills and degree come from the user's profile; the inputs saved with a
+    deferred explanation fill in what the profile lacks (and the experience
+    level, which nothing else records).
+    """
+    approved = Prediction.objects.filter(is_approved=True).select_related("explanation")
+    if since is not None:
+        approved = approved.filter(approved_at__gt=since)
+    approved = list(approved)
+
+    user_ids = {p.user_id for p in approved}
+
+    skills_by_user = {}
+    for user_id, skill_name in Skill.objects.filter(user_id__in=user_ids).values_list("user_id", "skill_name"):
+        skills_by_user.setdefault(user_id, []).append(skill_name)
+
+    degree_by_user = {}
+    for user_id, degree in Education.objects.filter(user_id__in=user_ids).values_list("user_id", "degree"):
+        degree_by_user.setdefault(user_id, degree)
+
+    samples = []
+    latest = None
+
+    for p in approved:
+        if p.approved_at is not None and (latest is None or p.approved_at > latest):
+            latest = p.approved_at
+
+        inputs = p.explanation.inputs if hasattr(p, "explanation") else {}
+        profile = {
+            "skills": skills_by_user.get(p.user_id) or inputs.get("skills"),
+            "qualification": p.education_qualification or degree_by_user.get(p.user_id),
+            "experience_level": inputs.get("experience_level", FEEDBACK_DEFAULT_EXPERIENCE),
+        }
+        if profile["skills"] and profile["qualification"]:
+            samples.append((profile, p.predicted_roles))
+
+    return samples, latest
+
+
+def train_incremental(progress=None):
+    """
+    Add warm-started trees to the active forest from approved feedback.
+
+    The new trees are fit on the feedback received since the active version
+    was built plus its per-role replay rows, so every class is present and
+    the existing trees are untouched. Feature columns and encoders stay the
+    same: unseen skills are ignored, and feedback for roles or categories the
+    model doesn't know is skipped.
+    """
+    report = progress or (lambda stage, percent: None)
+
+    report("feedback", 5)
+    artifacts = load_artifacts()
+    if "pickle_path" not in artifacts:
+        raise ValueError("Incremental training needs a published model version")
+
+    base_version = artifacts["version"]
+    manifest = read_manifest(base_version)
+    samples = load_samples(base_version)
+    if "replay" not in samples:
+        raise ValueError("Model version has no replay samples; run a full retrain first")
+
+    since = manifest["metrics"].get("feedback_until")
+    profiles, latest = feedback_profiles(since)
+
+    # a private copy: the loaded model may be serving explain="full" right now
+    with open(artifacts["pickle_path"], "rb") as f:
+        base = pickle.load(f)
+    model = base["model"]
+
+    encoder = artifacts["feature_encoder"]
+    known_codes = set(model.classes_.tolist())
+    role_codes = {label: code for code, label in enumerate(encoder.role_labels)}
+
+    parsed, y_new = [], []
+    for profile, role in profiles:
+        code = role_codes.get(role.strip().lower())
+        if code not in known_codes:
+            continue
+        try:
+            parsed.append(encoder.parse(profile))
+        except ValueError:
+            continue
+        y_new.append(code)
+
+    if not parsed:
+        raise ValueError("No new approved feedback to learn from")
+
+    n_trees = len(model.estimators_) + settings.ML_INCREMENTAL_TREES
+    if n_trees > settings.ML_INCREMENTAL_MAX_TREES:
+        raise ValueError(
+            f"Forest would grow to {n_trees} trees (max {settings.ML_INCREMENTAL_MAX_TREES}); "
+            "run a full retrain instead"
+        )
+
+    X_replay, y_replay = samples["replay"]
+    X_fit = sparse.vstack([X_replay, sparse.csr_matrix(encoder.encode_parsed(parsed))], format="csr")
+    y_fit = np.concatenate([y_replay, np.asarray(y_new, dtype=y_replay.dtype)])
+
+    report("fit", 30)
+    fit_started = time.perf_counter()
+    model.set_params(warm_start=True, n_estimators=n_trees)
+    model.fit(X_fit, y_fit)
+    model.set_params(warm_start=False)
+    fit_seconds = time.perf_counter() - fit_started
+
+    report("publish", 70)
+    version = publish_trained_model(
+        model,
+        base["feature_cols"],
+        base["skill_vocab"],
+        base["encoders"],
+        read_metadata(base_version),
+        train_rows=(X_fit, y_fit),
+        holdout=samples["holdout"],
+        replay=replay_sample(X_fit, y_fit, settings.ML_REPLAY_ROWS_PER_ROLE),
+        fit_seconds=fit_seconds,
+        skill_encoding=base.get("skill_encoding"),
+        metrics={
+            "mode": "incremental",
+            "base_version": base_version,
+            "feedback_rows": len(parsed),
+            "feedback_until": (latest or timezone.now()).isoformat(),
+            "train_rows": int(X_fit.shape[0]),
+        },
+    )
+
+    return f"Added {settings.ML_INCREMENTAL_TREES} trees from {len(parsed)} feedback rows ({version})"
@@ -0,0 +1,256 @@
+import json
+import time
+import socket
+import struct
+import threading
+
+from django.conf import settings
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional, JSON frames carry the same data
+    msgpack = None
+
+
+# Frames on the inference socket: 4-byte big-endian length, then a 1-byte
+# format tag (b"M" msgpack / b"J" JSON) and the encoded body. The server
+# answers in the format it was asked in.
+HEADER = struct.Struct("!I")
+MAX_FRAME = 64 * 1024 * 1024
+
+
+class InferenceUnavailable(Exception):
+    """The sidecar could not be reached or broke the connection."""
+
+
+class InferenceError(Exception):
+    """The sidecar answered with an error (e.g. an unseen qualification)."""
+
+    def __init__(self, message, kind=None):
+        super().__init__(message)
+        self.kind = kind
+
+
+# errors the sidecar passes through with their in-process type
+PASSTHROUGH_ERRORS = {"ValueError": ValueError, "FileNotFoundError": FileNotFoundError}
+
+
+def encode_frame(message, fmt=None):
+    fmt = fmt or (b"M" if msgpack is not None else b"J")
+    if fmt == b"M":
+        body = msgpack.packb(message, use_bin_type=True)
+    else:
+        body = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    return HEADER.pack(len(body) + 1) + fmt + body
+
+
+def _recv_exactly(sock, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("inference socket closed")
+        buf += chunk
+    return bytes(buf)
+
+
+def read_frame(sock):
+    """
+    (message, format tag) of the next frame.
+    """
+    (length,) = HEADER.unpack(_recv_exactly(sock, HEADER.size))
+    if not 0 < length <= MAX_FRAME:
+        raise ConnectionError(f"bad frame length {length}")
+
+    frame = _recv_exactly(sock, length)
+    fmt, body = frame[:1], frame[1:]
+    if fmt == b"M":
+        if msgpack is None:
+            raise ConnectionError("msgpack frame but msgpack is not installed")
+        return msgpack.unpackb(body, raw=False), fmt
+    return json.loads(body), fmt
+
+
+class InferenceClient:
+    """
+    Client for the inference sidecar (manage.py inference_server).
+
+    One connection per thread, reused across requests and reopened once if
+    the server restarted in between. Batches are sent max_profiles at a time,
+    so each request frame is answered well within timeout.
+    """
+
+    def __init__(self, socket_path, timeout, max_profiles=100):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.max_profiles = max_profiles
+        self._local = threading.local()
+
+    def _connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            sock.close()
+
+    def call(self, message):
+        frame = encode_frame(message)
+
+        for attempt in range(2):
+            reused = getattr(self._local, "sock", None) is not None
+            try:
+                sock = self._connection()
+                sock.sendall(frame)
+                break
+            except OSError as exc:
+                self._close()
+                # a kept-alive connection to a restarted server fails on send
+                # (EPIPE) before the request reached anyone: safe to resend once
+                if attempt == 0 and reused:
+                    continue
+                raise InferenceUnavailable(str(exc)) from exc
+
+        try:
+            reply, _ = read_frame(sock)
+        except (OSError, ConnectionError) as exc:
+            # the request may be running (or have crashed the server): never resend it.
+            # The connection is out of sync with its replies from here on.
+            self._close()
+            raise InferenceUnavailable(str(exc)) from exc
+
+        if not reply.get("ok"):
+            raise InferenceError(reply.get("error", "inference failed"), reply.get("kind"))
+        return reply
+
+    def _chunks(self, profiles):
+        step = self.max_profiles or len(profiles) or 1
+        return [profiles[start:start + step] for start in range(0, max(len(profiles), 1), step)]
+
+    def _predict_chunks(self, profiles, explain, partial):
+        """
+        Replies for each chunk, all from one model version.
+        """
+        message = {"op": "predict", "explain": explain}
+        if partial:
+            message["partial"] = True
+
+        for _ in range(2):
+            replies = [self.call({**message, "profiles": chunk}) for chunk in self._chunks(profiles)]
+            # a new model landed between two chunks: score the batch again
+            if len({reply["version"] for reply in replies}) <= 1:
+                return replies
+
+        raise InferenceUnavailable("model version changed while scoring a batch")
+
+    def predict(self, profiles, explain):
+        """
+        (results, model_version) for a list of profiles.
+        """
+        replies = self._predict_chunks(profiles, explain, partial=False)
+        return [result for reply in replies for result in reply["results"]], replies[-1]["version"]
+
+    def predict_partial(self, profiles, explain):
+        """
+        (results, errors, model_version); see ml.predict.predict_job_roles_partial.
+        """
+        replies = self._predict_chunks(profiles, explain, partial=True)
+        return (
+            [result for reply in replies for result in reply["results"]],
+            [error for reply in replies for error in reply["errors"]],
+            replies[-1]["version"],
+        )
+
+
+_client = None
+# after a failed call, skip the sidecar until this time (time.monotonic())
+_down_until = 0.0
+
+
+def _get_client():
+    global _client
+    if _client is None:
+        _client = InferenceClient(
+            settings.ML_INFERENCE_SOCKET,
+            settings.ML_INFERENCE_TIMEOUT,
+            max_profiles=settings.ML_INFERENCE_MAX_PROFILES,
+        )
+    return _client
+
+
+def _from_sidecar(method, *args):
+    """
+    InferenceClient.<method>(*args), or None when no sidecar is configured or
+    it is unreachable (then it is skipped for ML_INFERENCE_RETRY_SECONDS).
+    """
+    global _down_until
+
+    if not settings.ML_INFERENCE_SOCKET or time.monotonic() < _down_until:
+        return None
+
+    try:
+        return getattr(_get_client(), method)(*args)
+    except InferenceUnavailable:
+        _down_until = time.monotonic() + settings.ML_INFERENCE_RETRY_SECONDS
+        return None
+    except InferenceError as exc:
+        raise PASSTHROUGH_ERRORS.get(exc.kind, InferenceError)(str(exc)) from exc
+
+
+def predict_job_roles(profiles, explain="full", with_version=False):
+    """
+    ml.predict.predict_job_roles, served by the sidecar when one is configured.
+
+    Falls back to in-process inference when ML_INFERENCE_SOCKET is unset or
+    the sidecar is unreachable; web workers only import and load the model
+    in that case. ValueError (bad input) and FileNotFoundError (no model)
+    from the sidecar are raised as such, same as in-process.
+    """
+    reply = _from_sidecar("predict", profiles, explain)
+    if reply is not None:
+        results, version = reply
+        return (results, version) if with_version else results
+
+    from .predict import predict_job_roles as predict_in_process
+
+    return predict_in_process(profiles, explain=explain, with_version=with_version)
+
+
+def predict_job_roles_partial(profiles, explain="full"):
+    """
+    ml.predict.predict_job_roles_partial, with the same sidecar routing and
+    fallback as predict_job_roles.
+    """
+    reply = _from_sidecar("predict_partial", profiles, explain)
+    if reply is not None:
+        return reply
+
+    from .predict import predict_job_roles_partial as predict_in_process
+
+    return predict_in_process(profiles, explain=explain)
+
+
+def predict_job_role(skills, qualification, experience_level, explain="full", with_version=False):
+    """
+    Single-profile form, same as ml.predict.predict_job_role.
+    """
+    if not settings.ML_INFERENCE_SOCKET:
+        from .predict import predict_job_role as predict_in_process
+
+        return predict_in_process(
+            skills, qualification, experience_level, explain=explain, with_version=with_version
+        )
+
+    results, version = predict_job_roles(
+        [{"skills": skills, "qualification": qualification, "experience_level": experience_level}],
+        explain=explain,
+        with_version=True,
+    )
+    return (results[0], version) if with_version else results[0]
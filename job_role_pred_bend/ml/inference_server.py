@@ -0,0 +1,78 @@
+import os
+import socketserver
+
+from .inference import PASSTHROUGH_ERRORS, encode_frame, read_frame
+from .predict import load_artifacts, predict_job_role, predict_job_roles, predict_job_roles_partial
+from .warmup import warm_up
+
+
+class InferenceHandler(socketserver.BaseRequestHandler):
+    """
+    One client connection: answer frames until the client hangs up.
+    """
+
+    def handle(self):
+        while True:
+            try:
+                message, fmt = read_frame(self.request)
+            except (OSError, ConnectionError):
+                return
+
+            self.request.sendall(encode_frame(self.answer(message), fmt))
+
+    def answer(self, message):
+        try:
+            op = message.get("op")
+
+            if op == "ping":
+                return {"ok": True, "version": load_artifacts()["version"]}
+
+            if op == "predict":
+                profiles = message["profiles"]
+                explain = message.get("explain", "full")
+
+                if message.get("partial"):
+                    results, errors, version = predict_job_roles_partial(profiles, explain=explain)
+                    return {"ok": True, "results": results, "errors": errors, "version": version}
+
+                if len(profiles) == 1:
+                    # single requests go through the micro-batcher when it is on
+                    p = profiles[0]
+                    result, version = predict_job_role(
+                        p["skills"], p["qualification"], p["experience_level"],
+                        explain=explain, with_version=True,
+                    )
+                    results = [result]
+                else:
+                    results, version = predict_job_roles(profiles, explain=explain, with_version=True)
+
+                return {"ok": True, "results": results, "version": version}
+
+            return {"ok": False, "error": f"Unknown op '{op}'"}
+
+        except Exception as exc:
+            kind = type(exc).__name__
+            return {
+                "ok": False,
+                "error": str(exc),
+                "kind": kind if kind in PASSTHROUGH_ERRORS else None,
+            }
+
+
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(socket_path):
+    """
+    Own the model artifacts and serve predictions on a Unix domain socket.
+    """
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+    # load + JIT before accepting connections; a missing model is served as errors
+    warm_up()
+
+    with InferenceServer(socket_path, InferenceHandler) as server:
+        os.chmod(socket_path, 0o660)
+        server.serve_forever()
@@ -0,0 +1,270 @@
+import os
+import json
+import shutil
+import hashlib
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+COLUMNS = ["skills", "qualification", "experience_level", "job_role"]
+
+# bump when the store layout or encoding changes, so cached stores are rebuilt
+STORE_FORMAT = 1
+
+FEATURES_NAME = "features.npz"
+LABELS_NAME = "labels.npy"
+META_NAME = "meta.json"
+
+
+def tokenize_skills(series):
+    """
+    Single pass over a skills column: the set of lowercased skills per row.
+    """
+    return [
+        {s.strip().lower() for s in str(row).split(",") if s.strip()}
+        for row in series.fillna("")
+    ]
+
+
+class Codebook:
+    """
+    Assigns ids to labels in order of first appearance while streaming, and
+    remaps them to sorted (LabelEncoder-compatible) codes at the end.
+    """
+
+    def __init__(self):
+        self.ids = {}
+
+    def code(self, label):
+        code = self.ids.get(label)
+        if code is None:
+            code = self.ids[label] = len(self.ids)
+        return code
+
+    def sorted_labels(self):
+        labels = sorted(self.ids)
+        remap = np.empty(len(labels), dtype=np.int64)
+        for new_code, label in enumerate(labels):
+            remap[self.ids[label]] = new_code
+        return labels, remap
+
+
+def build_feature_store(dataset, store_dir, chunk_rows):
+    """
+    Stream a candidate CSV in chunks into an on-disk sparse feature store.
+
+    Each chunk is normalized, tokenized and encoded against codebooks that
+    grow as new skills/categories appear, then spilled to a chunk file, so
+    only one chunk of raw text is in memory at a time. At the end the chunks
+    are merged into one CSR matrix with sorted column/category codes:
+
+    - features.npz  CSR [qualification, experience_level, skill__*]
+    - labels.npy    job_role codes
+    - meta.json     vocabulary, class labels, frontend metadata
+    """
+    os.makedirs(store_dir, exist_ok=True)
+
+    skills_cb, qual_cb, exp_cb, role_cb = Codebook(), Codebook(), Codebook(), Codebook()
+
+    # ORIGINAL casing for the frontend dropdowns
+    frontend = {"qualification": set(), "experience_level": set(), "skills": set()}
+
+    chunk_paths = []
+    n_rows = 0
+
+    for chunk in pd.read_csv(dataset, usecols=COLUMNS, chunksize=chunk_rows):
+        frontend["qualification"].update(chunk["qualification"].dropna().unique())
+        frontend["experience_level"].update(chunk["experience_level"].dropna().unique())
+        frontend["skills"].update(
+            s.strip()
+            for row in chunk["skills"].fillna("")
+            for s in str(row).split(",")
+            if s.strip()
+        )
+
+        # rows without a target can't be learned from
+        chunk = chunk.dropna(subset=["job_role"])
+
+        # --- normalize ONLY for model training ---
+        for col in COLUMNS:
+            if pd.api.types.is_string_dtype(chunk[col].dtype):
+                chunk[col] = chunk[col].str.strip().str.lower()
+
+        indptr = [0]
+        indices = []
+        for skills in tokenize_skills(chunk["skills"]):
+            indices.extend(skills_cb.code(skill) for skill in skills)
+            indptr.append(len(indices))
+
+        path = os.path.join(store_dir, f"chunk_{len(chunk_paths):05d}.npz")
+        np.savez(
+            path,
+            indptr=np.asarray(indptr, dtype=np.int64),
+            indices=np.asarray(indices, dtype=np.int64),
+            qualification=np.array(
+                [qual_cb.code(v) for v in chunk["qualification"].fillna("")], dtype=np.int64
+            ),
+            experience_level=np.array(
+                [exp_cb.code(v) for v in chunk["experience_level"].fillna("")], dtype=np.int64
+            ),
+            job_role=np.array([role_cb.code(v) for v in chunk["job_role"]], dtype=np.int64),
+        )
+        chunk_paths.append(path)
+        n_rows += len(chunk)
+
+    # --- merge chunks, remapping first-appearance ids to sorted codes ---
+    skill_vocab, skill_remap = skills_cb.sorted_labels()
+    qual_labels, qual_remap = qual_cb.sorted_labels()
+    exp_labels, exp_remap = exp_cb.sorted_labels()
+    role_labels, role_remap = role_cb.sorted_labels()
+
+    indptr_parts = [np.zeros(1, dtype=np.int64)]
+    index_parts, qual_parts, exp_parts, role_parts = [], [], [], []
+    offset = 0
+
+    for path in chunk_paths:
+        with np.load(path) as part:
+            index_parts.append(skill_remap[part["indices"]])
+            indptr_parts.append(part["indptr"][1:] + offset)
+            offset += len(part["indices"])
+            qual_parts.append(qual_remap[part["qualification"]])
+            exp_parts.append(exp_remap[part["experience_level"]])
+            role_parts.append(role_remap[part["job_role"]])
+        os.remove(path)
+
+    if not chunk_paths:
+        raise ValueError("Dataset has no rows")
+
+    indices = np.concatenate(index_parts)
+    skills_matrix = sparse.csr_matrix(
+        (np.ones(len(indices), dtype=np.float32), indices, np.concatenate(indptr_parts)),
+        shape=(n_rows, len(skill_vocab)),
+    )
+    skills_matrix.sort_indices()
+
+    categorical = sparse.csr_matrix(
+        np.column_stack([np.concatenate(qual_parts), np.concatenate(exp_parts)]).astype(np.float32)
+    )
+    X = sparse.hstack([categorical, skills_matrix], format="csr")
+    y = np.concatenate(role_parts)
+
+    sparse.save_npz(os.path.join(store_dir, FEATURES_NAME), X)
+    np.save(os.path.join(store_dir, LABELS_NAME), y)
+
+    meta = {
+        "n_rows": n_rows,
+        "skill_vocab": skill_vocab,
+        "classes": {
+            "qualification": qual_labels,
+            "experience_level": exp_labels,
+            "job_role": role_labels,
+        },
+        "metadata": {field: sorted(values) for field, values in frontend.items()},
+    }
+    with open(os.path.join(store_dir, META_NAME), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    return store_dir
+
+
+def dataset_digest(dataset):
+    """
+    sha256 of a dataset path or file-like object, read in blocks.
+    """
+    digest = hashlib.sha256()
+
+    if isinstance(dataset, (str, os.PathLike)):
+        with open(dataset, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    else:
+        for block in iter(lambda: dataset.read(1 << 20), b""):
+            digest.update(block)
+        dataset.seek(0)
+
+    return digest.hexdigest()
+
+
+def cached_feature_store(dataset, cache_dir, chunk_rows, keep):
+    """
+    Store directory for a dataset, built only when its content is new.
+
+    Stores live under cache_dir/<content hash>; one is renamed into place
+    only once complete, so an existing directory is always usable. Returns
+    (store_dir, hit). The `keep` most recently used stores are kept.
+    """
+    key = f"{dataset_digest(dataset)[:32]}-v{STORE_FORMAT}"
+    store_dir = os.path.join(cache_dir, key)
+
+    if os.path.isdir(store_dir):
+        os.utime(store_dir)  # most recently used, for pruning
+        return store_dir, True
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_dir = os.path.join(cache_dir, f".{key}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    try:
+        build_feature_store(dataset, tmp_dir, chunk_rows)
+        os.rename(tmp_dir, store_dir)
+    except OSError:
+        # built concurrently by another worker
+        if not os.path.isdir(store_dir):
+            raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    _prune_stores(cache_dir, keep)
+    return store_dir, False
+
+
+def _prune_stores(cache_dir, keep):
+    stores = [
+        entry for entry in os.scandir(cache_dir)
+        if entry.is_dir() and not entry.name.startswith(".")
+    ]
+    stores.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+
+    for entry in stores[keep:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def load_feature_store(store_dir):
+    """
+    (X csr, y, meta) from a store written by build_feature_store.
+    """
+    X = sparse.load_npz(os.path.join(store_dir, FEATURES_NAME)).tocsr()
+    y = np.load(os.path.join(store_dir, LABELS_NAME))
+    with open(os.path.join(store_dir, META_NAME), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    return X, y, meta
+
+
+def deduplicate(X, y):
+    """
+    Collapse identical (features, label) rows into one row each.
+
+    Returns (X_unique csr, y_unique, counts); fitting on those with
+    sample_weight=counts stands in for fitting on every duplicate.
+    """
+    X = X.tocsr()
+    X.sort_indices()
+
+    first_row = {}
+    counts = []
+    keep = []
+
+    for i in range(X.shape[0]):
+        start, end = X.indptr[i], X.indptr[i + 1]
+        key = (y[i], X.indices[start:end].tobytes(), X.data[start:end].tobytes())
+        slot = first_row.get(key)
+        if slot is None:
+            first_row[key] = len(keep)
+            keep.append(i)
+            counts.append(1)
+        else:
+            counts[slot] += 1
+
+    keep = np.asarray(keep, dtype=np.int64)
+    return X[keep], y[keep], np.asarray(counts, dtype=np.float64)
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Serve predictions for all web workers from one process on a Unix socket."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--socket",
+            default=settings.ML_INFERENCE_SOCKET,
+            help="Socket path (default: ML_INFERENCE_SOCKET)",
+        )
+
+    def handle(self, *args, **options):
+        socket_path = options["socket"]
+        if not socket_path:
+            raise CommandError("No socket path: pass --socket or set ML_INFERENCE_SOCKET")
+
+        from ml.inference_server import serve
+
+        self.stdout.write(f"Inference server listening on {socket_path}")
+        try:
+            serve(socket_path)
+        except KeyboardInterrupt:
+            pass
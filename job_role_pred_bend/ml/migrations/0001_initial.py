@@ -0,0 +1,32 @@
+# Generated by Django 5.2.10 on 2026-10-17 18:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PredictionExplanation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('READY', 'Ready'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('inputs', models.JSONField(default=dict)),
+                ('predicted_role', models.JSONField(default=list)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('prediction', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='explanation', to='accounts.prediction')),
+            ],
+            options={
+                'db_table': 'prediction_explanation',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.10 on 2026-10-17 19:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ml', '0002_trainingjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trainingjob',
+            name='mode',
+            field=models.CharField(choices=[('full', 'Full retrain from CSV'), ('incremental', 'Incremental from feedback')], default='full', max_length=12),
+        ),
+        migrations.AlterField(
+            model_name='trainingjob',
+            name='dataset_path',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.10 on 2026-10-17 19:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ml', '0003_trainingjob_mode_alter_trainingjob_dataset_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trainingjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='trainingjob',
+            name='worker',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
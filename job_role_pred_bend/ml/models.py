@@ -1,3 +1,75 @@
+from django.conf import settings
+from django.db import models
 
 
+# -------------------------------
+# Deferred Prediction Explanations
+# -------------------------------
+class PredictionExplanation(models.Model):
+    STATUS_CHOICES = (
+        ('PENDING', 'Pending'),
+        ('READY', 'Ready'),
+        ('FAILED', 'Failed'),
+    )
 
+    prediction = models.OneToOneField(
+        'accounts.Prediction',
+        on_delete=models.CASCADE,
+        related_name='explanation'
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    # profile the prediction was made from, so the explanation can be (re)computed
+    inputs = models.JSONField(default=dict)
+    # full top-3 payload with reasons, same shape as /api/ml/predict/ predicted_role
+    predicted_role = models.JSONField(default=list)
+    error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'prediction_explanation'
+
+
+# -------------------------------
+# Background Training Jobs
+# -------------------------------
+class TrainingJob(models.Model):
+    STATUS_CHOICES = (
+        ('QUEUED', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('SUCCEEDED', 'Succeeded'),
+        ('FAILED', 'Failed'),
+    )
+
+    MODE_CHOICES = (
+        ('full', 'Full retrain from CSV'),
+        ('incremental', 'Incremental from feedback'),
+    )
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+    mode = models.CharField(max_length=12, choices=MODE_CHOICES, default='full')
+    # uploaded CSV, copied out of the request so the worker can read it later (full mode)
+    dataset_path = models.CharField(max_length=500, blank=True)
+    stage = models.CharField(max_length=50, blank=True)
+    progress = models.PositiveSmallIntegerField(default=0)
+    # model version published by this job
+    version = models.CharField(max_length=32, blank=True)
+    message = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='training_jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # "host:pid" of the process whose executor holds the job, refreshed while it is queued or running
+    worker = models.CharField(max_length=100, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'training_job'
+        ordering = ['-created_at']
@@ -1,166 +1,336 @@
 import os
+import json
+import time
 import pickle
+import threading
 import numpy as np
-import pandas as pd
 from django.conf import settings
 
+from .artifacts import CURRENT_PATH, content_version, load_bundle, read_report
+from .encoder import FeatureEncoder
+from .forest import FlatForest
+from .explain import (
+    EXPLAIN_MODES, shap_contributions, fast_contributions, build_reasons,
+)
+from .result_cache import prediction_cache, canonical_key
+from .batcher import MicroBatcher
+
 
 MODEL_PATH = settings.ML_MODEL_PATH
 
+# Process-wide artifact cache. Held as one (file_key, version, artifacts) tuple
+# so readers always see a complete model; replaced only under _load_lock.
+_loaded = None
+_load_lock = threading.Lock()
 
-def load_artifacts():
-    if not os.path.exists(MODEL_PATH):
-        raise FileNotFoundError("Model not trained yet.")
 
-    with open(MODEL_PATH, "rb") as f:
-        artifacts = pickle.load(f)
+def _file_key(st):
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
 
+def _build_serving_artifacts(version):
+    """
+    Serving view of a published version: mmapped arrays plus small JSON tables.
+    The sklearn model and explainer stay on disk until explain="full" needs them.
+    """
+    manifest, forest, attributions, pickle_path = load_bundle(version)
+    labels = manifest["labels"]
+
+    return {
+        "version": version,
+        "feature_cols": manifest["feature_cols"],
+        "feature_encoder": FeatureEncoder(
+            manifest["feature_cols"],
+            labels["qualification"],
+            labels["experience_level"],
+            labels["job_role"],
+            hash_buckets=manifest.get("skill_encoding", {}).get("buckets", 0),
+        ),
+        "forest": forest,
+        "attributions": attributions,
+        "pickle_path": pickle_path,
+        # evaluation report, kept in memory for the admin endpoints
+        "report": read_report(version),
+    }
+
+
+def _build_legacy_artifacts(raw, version):
+    # single model.pkl written before versioned bundles existed
+    artifacts = pickle.loads(raw)
+    artifacts["version"] = version
+    artifacts["feature_encoder"] = FeatureEncoder.from_encoders(
+        artifacts["feature_cols"], artifacts["encoders"]
+    )
+    artifacts["forest"] = FlatForest.from_sklearn(artifacts["model"])
     return artifacts
 
 
-def safe_encode(enc, value, fallback):
+def load_artifacts():
     """
-    Try encoding. If unseen label comes in, encode the fallback instead.
+    Return the serving artifacts of the current model, reloading only when it changed.
+
+    train_model publishes a new version by atomically rewriting current.json,
+    so a changed inode/size/mtime means a new model landed. Falls back to a
+    legacy model.pkl when no version has been published yet.
     """
+    global _loaded
+
+    path = CURRENT_PATH if os.path.exists(CURRENT_PATH) else MODEL_PATH
+
     try:
-        return enc.transform([value])[0]
-    except Exception:
-        return enc.transform([fallback])[0]
+        key = (path, _file_key(os.stat(path)))
+    except FileNotFoundError:
+        raise FileNotFoundError("Model not trained yet.")
+
+    loaded = _loaded
+    if loaded is not None and loaded[0] == key:
+        return loaded[2]
+
+    with _load_lock:
+        loaded = _loaded
+        if loaded is not None and loaded[0] == key:
+            return loaded[2]
+
+        try:
+            with open(path, "rb") as f:
+                # key from the open file, not the path: the path may be swapped again meanwhile
+                key = (path, _file_key(os.fstat(f.fileno())))
+                raw = f.read()
+        except FileNotFoundError:
+            raise FileNotFoundError("Model not trained yet.")
+
+        if path == CURRENT_PATH:
+            version = json.loads(raw)["version"]
+        else:
+            version = content_version(raw)
+
+        started = time.perf_counter()
+
+        if loaded is not None and loaded[1] == version:
+            # touched but same version: keep the loaded objects
+            artifacts = loaded[2]
+        else:
+            if path == CURRENT_PATH:
+                artifacts = _build_serving_artifacts(version)
+            else:
+                artifacts = _build_legacy_artifacts(raw, version)
+            artifacts["load_seconds"] = round(time.perf_counter() - started, 4)
+
+        _loaded = (key, version, artifacts)
+        return artifacts
+
+
+def load_sklearn_artifacts(artifacts):
+    """
+    The full pickled artifacts (sklearn model, SHAP explainer, encoders) of a
+    loaded version, unpickled on first use and kept with that version.
+    """
+    if "explainer" in artifacts:
+        return artifacts
+
+    with _load_lock:
+        if "sklearn" not in artifacts:
+            with open(artifacts["pickle_path"], "rb") as f:
+                artifacts["sklearn"] = pickle.load(f)
+
+    return artifacts["sklearn"]
+
+
+def model_version():
+    """
+    Version (content hash) of the currently loaded model.
+    """
+    return load_artifacts()["version"]
+
+
+def predict_job_roles(profiles, explain="full", with_version=False):
+    """
+    Score many profiles with one predict_proba and one shap_values call.
+
+    Each profile is a dict with skills, qualification and experience_level.
+    Returns one top-3 list (same shape as predict_job_role) per profile.
 
+    explain picks how reasons are produced:
+    - full: exact SHAP values for the batch
+    - fast: lookup in the per-role attribution tables saved at training time
+      (falls back to full for models trained without them)
+    - none: no reasons, just the ranked roles
+
+    Profiles already in the result cache (same canonical input, same model
+    version) are served from it; only the misses reach the model.
+
+    with_version=True returns (results, model_version) so callers can record
+    exactly which version produced them.
+    """
+    results, _errors, version = _predict(profiles, explain, partial=False)
+
+    if with_version:
+        return results, version
+    return results
+
+
+def predict_job_roles_partial(profiles, explain="full"):
+    """
+    Like predict_job_roles, but a profile the model can't encode (unseen
+    qualification / experience level) doesn't fail the others.
+
+    Returns (results, errors, model_version): results[i] is None where
+    errors[i] holds the message. The valid profiles are still scored in one call.
+    """
+    return _predict(profiles, explain, partial=True)
+
+
+def _predict(profiles, explain, partial):
+    if explain not in EXPLAIN_MODES:
+        raise ValueError(f"explain must be one of {', '.join(EXPLAIN_MODES)}")
 
-def predict_job_role(skills, qualification, experience_level):
     artifacts = load_artifacts()
+    encoder = artifacts["feature_encoder"]
 
-    model = artifacts["model"]
-    feature_cols = artifacts["feature_cols"]
-    vocab = artifacts["skill_vocab"]
-    enc = artifacts["encoders"]
-
-    # ---------- NORMALIZE INPUT ----------
-    qualification = qualification.strip().lower()
-    experience_level = experience_level.strip().lower()
-
-    # skills can be a list (from dash_prediction_data) or a comma-separated string (from JSON)
-    if isinstance(skills, list):
-        incoming_skills = [
-            s.strip().lower()
-            for s in skills
-            if isinstance(s, str) and s.strip()
-        ]
-    else:
-        incoming_skills = [
-            s.strip().lower()
-            for s in str(skills).split(",")
-            if s.strip()
-        ]
+    if explain == "fast" and artifacts.get("attributions") is None:
+        explain = "full"
 
-    # ---------- BASE FEATURE DICT ----------
-    data = {col: 0 for col in feature_cols}
+    parsed = [None] * len(profiles)
+    errors = [None] * len(profiles)
+    for row, profile in enumerate(profiles):
+        try:
+            parsed[row] = encoder.parse(profile)
+        except ValueError as exc:
+            if not partial:
+                raise
+            errors[row] = str(exc)
 
-    # ---------- ENCODE CATEGORICAL (SAFE) ----------
-    data["qualification"] = safe_encode(enc["qualification"], qualification, "other")
-    data["experience_level"] = safe_encode(enc["experience_level"], experience_level, "other")
+    all_results = [None] * len(profiles)
+    valid_rows = [row for row, error in enumerate(errors) if error is None]
 
-    # ---------- SET SKILL FLAGS ----------
-    for skill in incoming_skills:
-        col = f"skill__{skill}"
-        if col in data:
-            data[col] = 1
+    # ---------- RESULT CACHE ----------
+    keys = {}
+    if prediction_cache is not None:
+        prediction_cache.check_version(artifacts["version"])
+        for row in valid_rows:
+            skills, qual_code, exp_code = parsed[row]
+            keys[row] = canonical_key(explain, encoder.cache_skills(skills), qual_code, exp_code)
+            all_results[row] = prediction_cache.get(keys[row], artifacts["version"])
 
-    df = pd.DataFrame([data])
+    miss_rows = [row for row in valid_rows if all_results[row] is None]
 
-    # ---------- PREDICT ----------
-    probs = model.predict_proba(df)[0]
+    if miss_rows:
+        computed = _score_parsed(artifacts, [parsed[row] for row in miss_rows], explain)
 
-    # ---------- SHAP VALUES ----------
-    explainer = artifacts["explainer"]
-    shap_values = explainer.shap_values(df)
+        for row, result in zip(miss_rows, computed):
+            all_results[row] = result
+            if prediction_cache is not None:
+                prediction_cache.set(keys[row], result, artifacts["version"])
 
-    # top‑3 indices (highest probability first)
-    top3_idx = probs.argsort()[-3:][::-1]
-    job_labels = enc["job_role"].inverse_transform(top3_idx)
+    return all_results, errors, artifacts["version"]
 
-    # ----------- BUILD REASONS (for roleCard) -----------
-    results = []
-
-    for i, idx in enumerate(top3_idx):
-        role_name = job_labels[i]
-        prob = float(probs[idx])
-
-        # ---------- SHAP CONTRIBUTIONS FOR THIS ROLE ----------
-        # shap_values can be:
-        # - list of arrays (one per class)
-        # - single array (n_samples, n_features)
-        # - array (n_samples, n_features, n_classes)
-        if isinstance(shap_values, list):
-            # list: one array per class
-            class_shap = shap_values[idx]      # shape (1, n_features)
-            contribs = class_shap[0]
-        else:
-            sv = np.array(shap_values)
-            if sv.ndim == 2:
-                # (1, n_features) – same SHAP vector for all roles
-                contribs = sv[0]
-            elif sv.ndim == 3:
-                # (1, n_features, n_classes) – pick this class
-                contribs = sv[0, :, idx]
-            else:
-                raise ValueError(f"Unexpected shap_values shape: {sv.shape}")
 
-        feature_importance = list(zip(feature_cols, contribs))
+def _score_parsed(artifacts, parsed, explain):
+    feature_cols = artifacts["feature_cols"]
+    encoder = artifacts["feature_encoder"]
+    attributions = artifacts.get("attributions")
 
-        # Sort by strongest positive influence
-        feature_importance.sort(key=lambda x: abs(x[1]), reverse=True)
+    # ---------- FEATURE MATRIX ----------
+    X = encoder.encode_parsed(parsed)
 
-        skill_reasons = []
-        edu_exp_reasons = []
+    # ---------- PREDICT ----------
+    # flat-array forest: same probabilities as model.predict_proba, no sklearn overhead
+    probs = artifacts["forest"].predict_proba(X)
 
-        # only allow reasons for skills actually present in input
-        input_skill_cols = {f"skill__{s}" for s in incoming_skills}
+    # ---------- SHAP VALUES ----------
+    if explain == "full":
+        explainer = load_sklearn_artifacts(artifacts)["explainer"]
+        shap_values = explainer.shap_values(X)
 
-        for feat, value in feature_importance[:15]:   # look at top influences
-            # skills: only consider input skills
-            if feat.startswith("skill__") and value > 0 and feat in input_skill_cols:
-                skill_name = feat.replace("skill__", "")
-                skill_reasons.append(f"{skill_name} aligned strongly with {role_name}")
+    # ----------- BUILD REASONS (for roleCard) -----------
+    all_results = []
 
-            # qualification
-            elif feat == "qualification" and value > 0:
-                decoded = enc["qualification"].inverse_transform(
-                    [int(df.iloc[0][feat])]
-                )[0]
-                edu_exp_reasons.append(
-                    f"Profiles with '{decoded}' frequently match {role_name}"
-                )
+    for row in range(len(parsed)):
+        # top‑3 indices (highest probability first)
+        top3_idx = probs[row].argsort()[-3:][::-1]
+        job_labels = [encoder.role_labels[i] for i in top3_idx]
 
-            # experience
-            elif feat == "experience_level" and value > 0:
-                decoded = enc["experience_level"].inverse_transform(
-                    [int(df.iloc[0][feat])]
-                )[0]
-                edu_exp_reasons.append(
-                    f"Experience level '{decoded}' is common among {role_name}s"
+        results = []
+        skills, qual_code, exp_code = parsed[row]
+        input_skills = encoder.skill_feature_names(skills) if explain != "none" else None
+
+        for i, idx in enumerate(top3_idx):
+            role_name = job_labels[i]
+            prob = float(probs[row, idx])
+
+            if explain == "none":
+                reasons = []
+            else:
+                if explain == "full":
+                    contribs = shap_contributions(shap_values, row, idx)
+                else:
+                    contribs = fast_contributions(
+                        attributions, X[row], idx,
+                        encoder.qual_col, encoder.exp_col, qual_code, exp_code,
+                    )
+
+                reasons = build_reasons(
+                    feature_cols,
+                    contribs,
+                    input_skills,
+                    encoder.qual_labels[qual_code],
+                    encoder.exp_labels[exp_code],
+                    role_name,
                 )
 
-            # stop once we have enough explanations
-            if len(skill_reasons) >= 3 and len(edu_exp_reasons) >= 2:
-                break
+            results.append(
+                {
+                    "role": role_name,
+                    "confidence": round(prob * 100, 2),
+                    "reasons": reasons,
+                }
+            )
 
-        # fallbacks if nothing positive appeared
-        if not skill_reasons:
-            skill_reasons.append("No direct skill signals — inferred from broader pattern")
+        all_results.append(results)
 
-        if not edu_exp_reasons:
-            edu_exp_reasons.append("Education/experience pattern inferred from model")
+    return all_results
 
-        reasons = skill_reasons + edu_exp_reasons
 
-        results.append(
-            {
-                "role": role_name,
-                "confidence": round(prob * 100, 2),
-                "reasons": reasons,
-            }
-        )
+def warm_up_model(artifacts, explain_modes=("none", "fast")):
+    """
+    Run a dummy profile through the model, bypassing the result cache, so
+    lazy work (numba JIT, pickle load for "full") happens before real traffic.
+    """
+    encoder = artifacts["feature_encoder"]
+    skills = list(encoder.skill_index)[:3]
+    parsed = [(skills, 0, 0)]
+
+    for explain in explain_modes:
+        if explain == "fast" and artifacts.get("attributions") is None:
+            continue
+        _score_parsed(artifacts, parsed, explain)
+
+
+# coalesces concurrent predict_job_role calls into one predict_job_roles call; None when off
+micro_batcher = (
+    MicroBatcher(
+        predict_job_roles,
+        max_batch=settings.ML_MICROBATCH_MAX_SIZE,
+        max_wait_ms=settings.ML_MICROBATCH_MAX_WAIT_MS,
+    )
+    if settings.ML_MICROBATCH_ENABLED
+    else None
+)
+
+
+def predict_job_role(skills, qualification, experience_level, explain="full", with_version=False):
+    profile = {
+        "skills": skills,
+        "qualification": qualification,
+        "experience_level": experience_level,
+    }
+
+    if micro_batcher is not None:
+        result, version = micro_batcher.submit(profile, explain)
+    else:
+        results, version = predict_job_roles([profile], explain=explain, with_version=True)
+        result = results[0]
 
-    return results
+    if with_version:
+        return result, version
+    return result
@@ -0,0 +1,157 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache of prediction payloads with a TTL.
+
+    Keys are canonical profiles (see canonical_key), values the full top-3 +
+    reasons payload. Everything is dropped when the model version changes.
+    Cached payloads are shared between callers and must not be mutated.
+
+    get/set take the version of the artifacts the caller scored with, so a
+    request still running on the previous model can neither read nor store
+    entries once a new version has been seen.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def check_version(self, version):
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key) if version == self.version else None
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, version):
+        with self._lock:
+            # scored with a model that has since been replaced
+            if version != self.version:
+                return
+
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "local",
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class DjangoPredictionCache:
+    """
+    Same interface, backed by Django's cache framework so workers can share it.
+
+    The model version is part of every key, so a new model never reads old
+    entries; the backend's own eviction and TIMEOUT handle the rest.
+    """
+
+    def __init__(self, alias, ttl):
+        self.alias = alias
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def _cache(self):
+        from django.core.cache import caches
+        return caches[self.alias]
+
+    def check_version(self, version):
+        # versioned keys: nothing to drop
+        pass
+
+    def _backend_key(self, key, version):
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return f"ml:pred:{version}:{digest}"
+
+    def get(self, key, version):
+        value = self._cache.get(self._backend_key(key, version))
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value, version):
+        self._cache.set(self._backend_key(key, version), value, self.ttl)
+
+    def clear(self):
+        # entries of old versions are never read again and expire on their own
+        pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": f"django:{self.alias}",
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def canonical_key(explain, skills, qual_code, exp_code):
+    """
+    Canonical form of a profile: only what reaches the model matters, i.e. the
+    encoded categories and the sorted set of in-vocabulary skill columns
+    (skill names for hashed models, see FeatureEncoder.cache_skills).
+    """
+    return (explain, qual_code, exp_code, tuple(sorted(set(skills))))
+
+
+def _build_cache():
+    backend = settings.ML_RESULT_CACHE
+
+    if backend == "local":
+        return PredictionCache(settings.ML_RESULT_CACHE_SIZE, settings.ML_RESULT_CACHE_TTL)
+    if backend == "django":
+        return DjangoPredictionCache(settings.ML_RESULT_CACHE_ALIAS, settings.ML_RESULT_CACHE_TTL)
+    return None
+
+
+# process-wide instance; None when ML_RESULT_CACHE is "off"
+prediction_cache = _build_cache()
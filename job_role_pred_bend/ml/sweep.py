@@ -0,0 +1,115 @@
+import os
+import time
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import KFold, StratifiedKFold
+
+from .forest import FlatForest
+
+
+# Candidate space for the optional sweep stage of train_model
+SWEEP_GRID = {
+    "n_estimators": [40, 80, 150],
+    "max_depth": [None, 20],
+    "min_samples_leaf": [1, 2],
+    "max_features": ["sqrt", 0.3],
+}
+
+LATENCY_RUNS = 200
+
+
+def candidate_params(grid=SWEEP_GRID):
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+
+def _folds(y, n_folds):
+    # stratify when every role has enough rows for it, plain k-fold otherwise
+    if np.bincount(y).min() >= n_folds:
+        return StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=42).split(np.zeros(len(y)), y)
+    return KFold(n_splits=n_folds, shuffle=True, random_state=42).split(np.zeros(len(y)))
+
+
+def _cross_validate(params, X, y, n_folds, sample_weight=None):
+    """
+    Runs in a pool worker: k-fold accuracy for one candidate, plus the flat
+    forest of the first fold so the parent can time it.
+    """
+    scores = []
+    flat = None
+
+    for train_idx, test_idx in _folds(y, n_folds):
+        model = RandomForestClassifier(random_state=42, n_jobs=1, **params)
+        if sample_weight is None:
+            model.fit(X[train_idx], y[train_idx])
+            scores.append(model.score(X[test_idx], y[test_idx]))
+        else:
+            model.fit(X[train_idx], y[train_idx], sample_weight=sample_weight[train_idx])
+            scores.append(model.score(X[test_idx], y[test_idx], sample_weight=sample_weight[test_idx]))
+        if flat is None:
+            flat = FlatForest.from_sklearn(model)
+
+    return scores, flat
+
+
+def single_row_latency_ms(forest, row, runs=LATENCY_RUNS):
+    """
+    Median wall time of one single-profile predict_proba, the serving hot path.
+    """
+    forest.predict_proba(row)  # JIT / first-touch outside the timing
+
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        forest.predict_proba(row)
+        timings.append(time.perf_counter() - started)
+
+    return float(np.median(timings)) * 1000
+
+
+def run_sweep(X, y, n_folds=3, latency_budget_ms=0.0, workers=0, grid=SWEEP_GRID, sample_weight=None):
+    """
+    Cross-validate every candidate across a process pool, then time each one.
+
+    Accuracy is the mean k-fold score; latency is measured afterwards in this
+    process, one candidate at a time, so pool workers don't skew it. The best
+    candidate is the most accurate one within latency_budget_ms (0 = no
+    budget); if none fits, the fastest. sample_weight (duplicate counts)
+    weights both fitting and scoring. Returns (best_params, results).
+    """
+    candidates = candidate_params(grid)
+
+    # spawn, not fork: training runs on a thread inside the web process
+    with ProcessPoolExecutor(
+        max_workers=workers or os.cpu_count(),
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as pool:
+        futures = [pool.submit(_cross_validate, params, X, y, n_folds, sample_weight) for params in candidates]
+        outcomes = [future.result() for future in futures]
+
+    row = X[:1].toarray() if hasattr(X, "toarray") else X[:1]
+    results = []
+
+    for params, (scores, flat) in zip(candidates, outcomes):
+        results.append({
+            "params": params,
+            "cv_accuracy": round(float(np.mean(scores)), 4),
+            "cv_std": round(float(np.std(scores)), 4),
+            "latency_ms": round(single_row_latency_ms(flat, row), 4),
+            "size_bytes": int(sum(arr.nbytes for arr in flat.to_arrays().values())),
+        })
+
+    within_budget = [
+        r for r in results
+        if not latency_budget_ms or r["latency_ms"] <= latency_budget_ms
+    ]
+    if within_budget:
+        best = max(within_budget, key=lambda r: (r["cv_accuracy"], -r["latency_ms"]))
+    else:
+        best = min(results, key=lambda r: r["latency_ms"])
+
+    return best["params"], results
@@ -0,0 +1,183 @@
+import os
+import time
+import socket
+import threading
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import PredictionExplanation, TrainingJob
+
+
+# Background pool for work that should not hold up the request (explanations)
+_executor = ThreadPoolExecutor(
+    max_workers=settings.ML_EXPLAIN_WORKERS,
+    thread_name_prefix="ml-explain",
+)
+
+
+def _explain_prediction(explanation_id, inputs):
+    from .inference import predict_job_role
+
+    try:
+        result = predict_job_role(
+            inputs["skills"],
+            inputs["qualification"],
+            inputs["experience_level"],
+            explain=settings.ML_DEFERRED_EXPLAIN,
+        )
+        PredictionExplanation.objects.filter(id=explanation_id).update(
+            status="READY",
+            predicted_role=result,
+            completed_at=timezone.now(),
+        )
+    except Exception as exc:
+        PredictionExplanation.objects.filter(id=explanation_id).update(
+            status="FAILED",
+            error=str(exc)[:255],
+            completed_at=timezone.now(),
+        )
+    finally:
+        # worker threads get their own DB connection; don't leak it
+        connection.close()
+
+
+def submit_explanation(explanation):
+    """
+    Compute the reasons for a stored prediction off the request path, from
+    the attribution tables by default (ML_DEFERRED_EXPLAIN="full": exact SHAP).
+    """
+    return _executor.submit(_explain_prediction, explanation.id, explanation.inputs)
+
+
+# One training at a time per process; the file lock extends that across workers
+_train_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ml-train")
+
+TRAIN_LOCK_PATH = os.path.join(settings.ML_MODEL_DIR, "train.lock")
+
+
+def training_lock():
+    """
+    Exclusive lock held for the whole training run; blocks until it is free.
+    """
+    from .artifacts import file_lock
+
+    return file_lock(TRAIN_LOCK_PATH)
+
+
+def _run_training(job_id):
+    from .train import train_model
+    from .incremental import train_incremental
+    from .artifacts import read_current_version
+
+    def progress(stage, percent):
+        TrainingJob.objects.filter(id=job_id).update(stage=stage, progress=percent)
+
+    job = TrainingJob.objects.get(id=job_id)
+
+    try:
+        TrainingJob.objects.filter(id=job_id).update(stage="waiting for lock")
+        with training_lock():
+            TrainingJob.objects.filter(id=job_id).update(
+                status="RUNNING", started_at=timezone.now()
+            )
+            # publish_model renames a complete bundle into place and flips
+            # current.json atomically, so serving keeps the old model until then
+            if job.mode == "incremental":
+                message = train_incremental(progress=progress)
+            else:
+                message = train_model(job.dataset_path, progress=progress)
+            version = read_current_version()
+
+        TrainingJob.objects.filter(id=job_id).update(
+            status="SUCCEEDED",
+            stage="done",
+            progress=100,
+            version=version,
+            message=message[:255],
+            finished_at=timezone.now(),
+        )
+    except Exception as exc:
+        TrainingJob.objects.filter(id=job_id).update(
+            status="FAILED",
+            error=f"{type(exc).__name__}: {exc}",
+            finished_at=timezone.now(),
+        )
+    finally:
+        if job.dataset_path:
+            try:
+                os.remove(job.dataset_path)
+            except OSError:
+                pass
+        connection.close()
+
+
+def submit_training(job):
+    """
+    Queue a training job; the request returns immediately with its id.
+    """
+    with _owned_lock:
+        _owned_jobs.add(job.id)
+        _start_heartbeat()
+    TrainingJob.objects.filter(id=job.id).update(worker=_worker_id(), heartbeat_at=timezone.now())
+
+    future = _train_executor.submit(_run_training, job.id)
+    future.add_done_callback(lambda _: _release_job(job.id))
+    return future
+
+
+# Jobs sitting in this process's executor. They exist only in memory, so a
+# heartbeat thread keeps their rows fresh; once it stops (worker restarted or
+# redeployed) fail_stale_jobs marks them FAILED instead of leaving them
+# QUEUED/RUNNING forever.
+_owned_jobs = set()
+_owned_lock = threading.Lock()
+_heartbeat = None
+
+
+def _worker_id():
+    # at call time: with gunicorn --preload this module is imported in the master
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _release_job(job_id):
+    with _owned_lock:
+        _owned_jobs.discard(job_id)
+
+
+def _start_heartbeat():
+    global _heartbeat
+    if _heartbeat is None:
+        _heartbeat = threading.Thread(target=_beat, name="ml-train-heartbeat", daemon=True)
+        _heartbeat.start()
+
+
+def _beat():
+    while True:
+        time.sleep(settings.ML_TRAIN_HEARTBEAT_SECONDS)
+        with _owned_lock:
+            job_ids = list(_owned_jobs)
+        if not job_ids:
+            continue
+        try:
+            TrainingJob.objects.filter(id__in=job_ids).update(heartbeat_at=timezone.now())
+        except Exception:
+            # DB hiccup: the next beat tries again
+            connection.close()
+
+
+def fail_stale_jobs():
+    """
+    Mark queued/running jobs whose worker stopped heartbeating as FAILED.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.ML_TRAIN_STALE_SECONDS)
+    return TrainingJob.objects.filter(
+        status__in=("QUEUED", "RUNNING"), heartbeat_at__lt=cutoff
+    ).update(
+        status="FAILED",
+        error="Worker stopped while the job was queued or running (restart or redeploy); please retry",
+        finished_at=timezone.now(),
+    )
@@ -1,3 +1,1673 @@
-from django.test import TestCase
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import struct
+import tempfile
+import threading
+import subprocess
+import socketserver
+from unittest import mock
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import timedelta
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, OperationalError
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import LabelEncoder
+
+from accounts.models import Prediction, Skill
+
+from . import artifacts
+from .admission import ADMITTED, AdmissionController, PredictRateThrottle, TokenBuckets
+from .batcher import MicroBatcher
+from .encoder import FeatureEncoder
+from .explain import build_role_attributions, fast_contributions
+from .forest import FlatForest
+from .inference import InferenceClient, InferenceUnavailable, encode_frame, msgpack, read_frame
+from .ingest import build_feature_store, deduplicate, load_feature_store
+from .models import PredictionExplanation, TrainingJob
+from .result_cache import PredictionCache
+from .vocab import hash_bucket, hash_skill_columns, keep_skill_columns, select_skills
+from .writebehind import WriteBehindBuffer
+
+
+def isolated_model_dir(add_cleanup, **overrides):
+    """
+    Point the model registry and serving cache at a throwaway ML_MODEL_DIR.
+
+    add_cleanup is a test's addCleanup (or a class's addClassCleanup).
+    Returns the directory.
+    """
+    from . import predict
+
+    tmp = tempfile.mkdtemp()
+    add_cleanup(shutil.rmtree, tmp, True)
+
+    # the registry paths are read from settings at import time
+    paths = [
+        mock.patch.multiple(
+            artifacts,
+            MODEL_DIR=tmp,
+            VERSIONS_DIR=os.path.join(tmp, "versions"),
+            CURRENT_PATH=os.path.join(tmp, "current.json"),
+        ),
+        mock.patch.multiple(
+            predict,
+            CURRENT_PATH=os.path.join(tmp, "current.json"),
+            MODEL_PATH=os.path.join(tmp, "model.pkl"),
+            _loaded=None,
+        ),
+    ]
+    for patcher in paths:
+        patcher.start()
+        add_cleanup(patcher.stop)
+
+    overrides = override_settings(**{
+        "ML_MODEL_DIR": tmp,
+        "ML_MODEL_PATH": os.path.join(tmp, "model.pkl"),
+        "ML_METADATA_PATH": os.path.join(tmp, "metadata.json"),
+        "ML_FEATURE_STORE_DIR": os.path.join(tmp, "feature_store"),
+        "ML_ATTRIBUTION_SAMPLE_ROWS": 100,
+        **overrides,
+    })
+    overrides.enable()
+    add_cleanup(overrides.disable)
+    return tmp
+
+
+# skills -> role of the synthetic training set
+SAMPLE_ROLES = {
+    "Data Scientist": ["Python", "SQL", "Machine Learning", "Statistics"],
+    "Frontend Developer": ["HTML", "CSS", "JavaScript", "React"],
+    "Data Analyst": ["SQL", "Excel", "Tableau", "Statistics"],
+    "Backend Developer": ["Python", "Django", "SQL", "Docker"],
+    "DevOps Engineer": ["Docker", "Kubernetes", "Linux", "Python"],
+}
+SAMPLE_QUALIFICATIONS = ["Bachelor's in Computer Science", "Master's in Data Science", "Other"]
+SAMPLE_EXPERIENCE = ["Entry", "Mid", "Senior"]
+
+
+def sample_dataset(path, n_rows=300, seed=0):
+    """
+    Write a small candidate CSV whose roles are learnable from the skills.
+    """
+    rng = np.random.default_rng(seed)
+    roles = sorted(SAMPLE_ROLES)
+    rows = []
+
+    for i in range(n_rows):
+        role = roles[i % len(roles)]
+        skills = list(rng.choice(SAMPLE_ROLES[role], size=3, replace=False))
+        rows.append({
+            "candidate_id": i + 1,
+            "skills": ", ".join(skills),
+            "qualification": SAMPLE_QUALIFICATIONS[rng.integers(len(SAMPLE_QUALIFICATIONS))],
+            "experience_level": SAMPLE_EXPERIENCE[rng.integers(len(SAMPLE_EXPERIENCE))],
+            "job_role": role,
+        })
+
+    pd.DataFrame(rows).to_csv(path, index=False)
+    return path
+
+
+class TrainedModelMixin:
+    """
+    Trains a small model on sample_dataset into a throwaway ML_MODEL_DIR,
+    once per test class. model_settings override settings for the class.
+    """
+
+    model_settings = {}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        from .train import train_model
+
+        cls.model_dir = isolated_model_dir(cls.addClassCleanup, **cls.model_settings)
+        train_model(sample_dataset(os.path.join(cls.model_dir, "dataset.csv")))
+
+
+class FlatForestParityTests(SimpleTestCase):
+    """
+    FlatForest must reproduce RandomForestClassifier.predict_proba exactly.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        rng = np.random.default_rng(0)
+
+        # same shape as the real features: two label-encoded categoricals + multi-hot skills
+        X = np.hstack([
+            rng.integers(0, 12, size=(400, 1)),
+            rng.integers(0, 4, size=(400, 1)),
+            rng.integers(0, 2, size=(400, 40)),
+        ]).astype(np.float64)
+        y = (X[:, 0] + X[:, 2:6].sum(axis=1)).astype(int) % 7
+
+        cls.model = RandomForestClassifier(n_estimators=30, random_state=42).fit(X, y)
+        cls.forest = FlatForest.from_sklearn(cls.model)
+        cls.X = X[:100]
+
+    def test_predict_proba_matches_sklearn(self):
+        np.testing.assert_array_equal(
+            self.forest.predict_proba(self.X), self.model.predict_proba(self.X)
+        )
+
+    def test_numpy_path_matches_sklearn(self):
+        np.testing.assert_array_equal(
+            self.forest.predict_proba_numpy(self.X), self.model.predict_proba(self.X)
+        )
+
+    def test_single_row(self):
+        row = self.X[:1]
+        np.testing.assert_array_equal(
+            self.forest.predict_proba(row), self.model.predict_proba(row)
+        )
+
+    def test_classes_follow_model(self):
+        np.testing.assert_array_equal(self.forest.classes_, self.model.classes_)
+
+
+class PredictionCacheTests(SimpleTestCase):
+    """
+    Entries never cross a model version change.
+    """
+
+    def setUp(self):
+        self.cache = PredictionCache(max_size=10, ttl=60)
+        self.cache.check_version("v1")
+        self.cache.set("key", "old payload", "v1")
+
+    def test_hit_on_same_version(self):
+        self.assertEqual(self.cache.get("key", "v1"), "old payload")
+
+    def test_version_change_clears(self):
+        self.cache.check_version("v2")
+        self.assertIsNone(self.cache.get("key", "v2"))
+        self.assertEqual(self.cache.stats()["size"], 0)
+
+    def test_late_set_from_old_model_is_dropped(self):
+        # a request scored with v1 finishes after another one switched the cache to v2
+        self.cache.check_version("v2")
+        self.cache.set("key", "old payload", "v1")
+        self.assertIsNone(self.cache.get("key", "v2"))
+        self.assertEqual(self.cache.stats()["size"], 0)
+
+    def test_stale_reader_misses(self):
+        self.cache.check_version("v2")
+        self.cache.set("key", "new payload", "v2")
+        self.assertIsNone(self.cache.get("key", "v1"))
+        self.assertEqual(self.cache.get("key", "v2"), "new payload")
+
+
+class ModelRegistryTests(SimpleTestCase):
+    """
+    activate / rollback / prune on a throwaway ML_MODEL_DIR.
+    """
+
+    def setUp(self):
+        tmp = isolated_model_dir(self.addCleanup, ML_MODEL_KEEP_VERSIONS=2)
+        self.versions_dir = os.path.join(tmp, "versions")
+        os.makedirs(self.versions_dir)
+
+    def make_version(self, name, age):
+        path = os.path.join(self.versions_dir, name)
+        os.makedirs(path)
+        with open(os.path.join(path, artifacts.METADATA_NAME), "w", encoding="utf-8") as f:
+            json.dump({"version": name}, f)
+        # prune orders bundles by directory mtime: older = larger age
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+
+    def existing(self):
+        return sorted(os.listdir(self.versions_dir))
+
+    def test_activate_records_history_and_metadata(self):
+        self.make_version("v1", 30)
+        self.make_version("v2", 20)
+
+        artifacts.activate_version("v1")
+        artifacts.activate_version("v2")
+
+        self.assertEqual(artifacts.read_current(), {"version": "v2", "history": ["v1", "v2"]})
+        with open(settings.ML_METADATA_PATH, encoding="utf-8") as f:
+            self.assertEqual(json.load(f), {"version": "v2"})
+
+    def test_activate_rejects_non_versions(self):
+        self.make_version("v1", 30)
+        os.makedirs(os.path.join(self.versions_dir, ".v2.123.tmp"))
+
+        for name in ("..", ".v2.123.tmp", "missing"):
+            with self.assertRaises(FileNotFoundError):
+                artifacts.activate_version(name)
+        self.assertIsNone(artifacts.read_current())
+
+    def test_rollback_returns_to_previous(self):
+        self.make_version("v1", 30)
+        self.make_version("v2", 20)
+        artifacts.activate_version("v1")
+        artifacts.activate_version("v2")
+
+        self.assertEqual(artifacts.rollback_version(), "v1")
+        self.assertEqual(artifacts.read_current(), {"version": "v1", "history": ["v1"]})
+
+    def test_rollback_without_previous_version(self):
+        self.make_version("v1", 30)
+        artifacts.activate_version("v1")
+
+        with self.assertRaises(ValueError):
+            artifacts.rollback_version()
+
+    def test_rollback_skips_pruned_versions(self):
+        for age, name in ((30, "v1"), (20, "v2"), (10, "v3")):
+            self.make_version(name, age)
+            artifacts.activate_version(name)
+
+        # keep=2: v1 is the oldest and no longer a rollback target
+        self.assertEqual(self.existing(), ["v2", "v3"])
+        self.assertEqual(artifacts.read_current()["history"], ["v1", "v2", "v3"])
+
+        self.assertEqual(artifacts.rollback_version(), "v2")
+        with self.assertRaises(ValueError):
+            artifacts.rollback_version()
+
+    def test_activation_protects_rollback_target(self):
+        # v2 is older than keep allows but is what a rollback would return to
+        self.make_version("v2", 40)
+        self.make_version("v3", 30)
+        self.make_version("v4", 20)
+        artifacts.activate_version("v2")
+        self.make_version("v5", 10)
+        artifacts.activate_version("v5")
+
+        self.assertEqual(self.existing(), ["v2", "v4", "v5"])
+
+    def test_concurrent_activations_keep_every_entry(self):
+        names = [f"v{i}" for i in range(12)]
+        for i, name in enumerate(names):
+            self.make_version(name, 100 - i)
+
+        threads = [threading.Thread(target=artifacts.activate_version, args=(name,)) for name in names]
+        with override_settings(ML_MODEL_KEEP_VERSIONS=len(names)):
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join(10)
+
+        self.assertEqual(sorted(artifacts.read_current()["history"]), sorted(names))
+
+    def test_prune_keeps_newest_and_protected(self):
+        for age, name in ((40, "v1"), (30, "v2"), (20, "v3"), (10, "v4")):
+            self.make_version(name, age)
+
+        artifacts.prune_versions(keep=1, protect={"v2"})
+
+        self.assertEqual(self.existing(), ["v2", "v4"])
+
+    def test_prune_ignores_temp_bundles(self):
+        self.make_version("v1", 20)
+        self.make_version("v2", 10)
+        os.makedirs(os.path.join(self.versions_dir, ".v3.99.tmp"))
+
+        artifacts.prune_versions(keep=1)
+
+        self.assertEqual(self.existing(), [".v3.99.tmp", "v2"])
+
+
+SAMPLE_CSV = """candidate_id,skills,qualification,experience_level,job_role
+1,"Python, SQL, Machine Learning",Master's in Data Science,Senior,Data Scientist
+2,"HTML, CSS, JavaScript",Bachelor's in Computer Science,Entry,Frontend Developer
+3,"sql, Excel , Tableau",Bachelor's in Statistics,Mid,Data Analyst
+4,"Python, Django, SQL",Bachelor's in Computer Science,Mid,Backend Developer
+5,"React, JavaScript, CSS",Bachelor's in Computer Science,Senior,Frontend Developer
+6,"Excel, Python",Master's in Data Science,Entry,
+7,"Python, SQL, Machine Learning",Master's in Data Science,Senior,Data Scientist
+8,"Docker, Kubernetes, Python",Bachelor's in Computer Science,Senior,DevOps Engineer
+"""
+
+
+class FeatureStoreTests(SimpleTestCase):
+    """
+    The chunked feature store must equal the one-shot pandas + LabelEncoder
+    encoding it replaced, whatever the chunk size.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.csv_path = os.path.join(self.tmp, "dataset.csv")
+        with open(self.csv_path, "w", encoding="utf-8") as f:
+            f.write(SAMPLE_CSV)
+
+    def build(self, chunk_rows):
+        store_dir = os.path.join(self.tmp, f"store_{chunk_rows}")
+        build_feature_store(self.csv_path, store_dir, chunk_rows)
+        return load_feature_store(store_dir)
+
+    def test_chunk_size_does_not_change_store(self):
+        X_small, y_small, meta_small = self.build(chunk_rows=2)
+        X_big, y_big, meta_big = self.build(chunk_rows=1000)
+
+        np.testing.assert_array_equal(X_small.toarray(), X_big.toarray())
+        np.testing.assert_array_equal(y_small, y_big)
+        self.assertEqual(meta_small, meta_big)
+
+    def test_matches_one_shot_encoding(self):
+        X, y, meta = self.build(chunk_rows=3)
+
+        # the pre-store path: whole CSV, lowercase, LabelEncoders, sorted skill vocabulary
+        df = pd.read_csv(self.csv_path).drop("candidate_id", axis=1).dropna(subset=["job_role"])
+        for col in df.columns:
+            df[col] = df[col].str.strip().str.lower()
+        skill_rows = [{s.strip() for s in row.split(",") if s.strip()} for row in df["skills"]]
+        vocab = sorted(set().union(*skill_rows))
+
+        encoders = {col: LabelEncoder().fit(df[col]) for col in ("qualification", "experience_level", "job_role")}
+        expected = np.zeros((len(df), 2 + len(vocab)), dtype=np.float32)
+        expected[:, 0] = encoders["qualification"].transform(df["qualification"])
+        expected[:, 1] = encoders["experience_level"].transform(df["experience_level"])
+        for row, skills in enumerate(skill_rows):
+            for skill in skills:
+                expected[row, 2 + vocab.index(skill)] = 1
+
+        self.assertEqual(meta["skill_vocab"], vocab)
+        for col, encoder in encoders.items():
+            self.assertEqual(meta["classes"][col], list(encoder.classes_))
+        np.testing.assert_array_equal(X.toarray(), expected)
+        np.testing.assert_array_equal(y, encoders["job_role"].transform(df["job_role"]))
+
+    def test_rows_without_role_are_skipped(self):
+        X, y, meta = self.build(chunk_rows=2)
+        self.assertEqual(X.shape[0], 7)
+        self.assertEqual(meta["n_rows"], 7)
+
+
+class DeduplicateTests(SimpleTestCase):
+
+    def test_collapses_identical_rows_into_counts(self):
+        X = sparse.csr_matrix(np.array([
+            [1, 0, 1, 0],
+            [0, 1, 0, 1],
+            [1, 0, 1, 0],
+            [1, 0, 1, 0],
+            [1, 0, 1, 0],   # same features, different label
+        ], dtype=np.float32))
+        y = np.array([3, 1, 3, 3, 2])
+
+        X_u, y_u, counts = deduplicate(X, y)
+
+        # first appearance order
+        np.testing.assert_array_equal(X_u.toarray(), X.toarray()[[0, 1, 4]])
+        np.testing.assert_array_equal(y_u, [3, 1, 2])
+        np.testing.assert_array_equal(counts, [3, 1, 1])
+
+    @staticmethod
+    def duplicated_rows():
+        # 200 draws from 30 distinct rows
+        rng = np.random.default_rng(0)
+        base = rng.integers(0, 2, size=(30, 8)).astype(np.float32)
+        rows = rng.integers(0, 30, size=200)
+        X = sparse.csr_matrix(base[rows])
+        y = (base[rows, :3].sum(axis=1) > 1).astype(int)
+        return X, y, base
+
+    def test_weighted_fit_matches_full_fit_without_bootstrap(self):
+        X, y, base = self.duplicated_rows()
+
+        X_u, y_u, counts = deduplicate(X, y)
+        self.assertEqual(counts.sum(), 200)
+        self.assertEqual(len(np.unique(X_u.toarray(), axis=0)), X_u.shape[0])
+
+        full = RandomForestClassifier(n_estimators=10, bootstrap=False, random_state=0).fit(X, y)
+        weighted = RandomForestClassifier(n_estimators=10, bootstrap=False, random_state=0).fit(
+            X_u, y_u, sample_weight=counts
+        )
+        np.testing.assert_allclose(weighted.predict_proba(base), full.predict_proba(base))
+
+    def test_bootstrap_fit_predicts_the_same_roles(self):
+        X, y, base = self.duplicated_rows()
+        X_u, y_u, counts = deduplicate(X, y)
+
+        # the forest train_model ships: with bootstrap, samples are drawn from the
+        # unique rows, so the trees (and probabilities) differ from a fit on every
+        # duplicate, but the predicted roles don't
+        full = RandomForestClassifier(n_estimators=150, random_state=42).fit(X, y)
+        weighted = RandomForestClassifier(n_estimators=150, random_state=42).fit(X_u, y_u, sample_weight=counts)
+
+        self.assertFalse(np.allclose(weighted.predict_proba(base), full.predict_proba(base)))
+        np.testing.assert_array_equal(weighted.predict(base), full.predict(base))
+
+
+class TrainingMetricsTests(TrainedModelMixin, SimpleTestCase):
+
+    def test_train_rows_counts_rows_before_deduplication(self):
+        metrics = artifacts.read_manifest(artifacts.read_current_version())["metrics"]
+
+        # sample_dataset: 300 rows, 20% held out
+        self.assertEqual((metrics["train_rows"], metrics["test_rows"]), (240, 60))
+        self.assertLess(metrics["unique_rows"], metrics["train_rows"])
+
+
+class SweepSelectionTests(SimpleTestCase):
+
+    GRID = {"n_estimators": [10, 20, 40]}
+    # per candidate: cv accuracy, single-row latency (ms)
+    OUTCOMES = {10: (0.80, 0.1), 20: (0.90, 0.5), 40: (0.95, 2.0)}
+
+    def sweep(self, **kwargs):
+        from . import sweep
+
+        X = sparse.csr_matrix(np.eye(4, dtype=np.float32))
+
+        def cross_validate(params, *args):
+            # the "forest" only has to carry its candidate to latency_ms
+            flat = mock.Mock(n=params["n_estimators"], **{"to_arrays.return_value": {}})
+            return [self.OUTCOMES[params["n_estimators"]][0]], flat
+
+        def latency_ms(forest, row):
+            return self.OUTCOMES[forest.n][1]
+
+        # threads instead of a spawned pool, so the patched scorer is the one that runs
+        with mock.patch.object(sweep, "ProcessPoolExecutor", lambda max_workers, mp_context: ThreadPoolExecutor(1)), \
+                mock.patch.object(sweep, "_cross_validate", cross_validate), \
+                mock.patch.object(sweep, "single_row_latency_ms", latency_ms):
+            params, results = sweep.run_sweep(X, np.arange(4), grid=self.GRID, **kwargs)
+        return params["n_estimators"], results
+
+    def test_no_budget_picks_the_most_accurate(self):
+        best, results = self.sweep()
+
+        self.assertEqual(best, 40)
+        self.assertEqual([r["latency_ms"] for r in results], [0.1, 0.5, 2.0])
+
+    def test_budget_picks_the_most_accurate_within_it(self):
+        self.assertEqual(self.sweep(latency_budget_ms=1.0)[0], 20)
+
+    def test_nothing_within_budget_picks_the_fastest(self):
+        self.assertEqual(self.sweep(latency_budget_ms=0.05)[0], 10)
+
+    def test_accuracy_ties_go_to_the_faster_candidate(self):
+        with mock.patch.dict(self.OUTCOMES, {40: (0.90, 2.0)}):
+            self.assertEqual(self.sweep()[0], 20)
+
+    def test_candidates_cross_validate_in_the_process_pool(self):
+        from .sweep import run_sweep
+
+        rng = np.random.default_rng(0)
+        X = sparse.csr_matrix(rng.integers(0, 2, size=(60, 6)).astype(np.float32))
+        y = np.asarray(X[:, :2].sum(axis=1)).ravel().astype(int)
+
+        params, results = run_sweep(X, y, workers=1, grid={"n_estimators": [2, 5], "max_depth": [3]})
+
+        self.assertEqual([r["params"] for r in results], [
+            {"max_depth": 3, "n_estimators": 2}, {"max_depth": 3, "n_estimators": 5},
+        ])
+        self.assertIn(params, [r["params"] for r in results])
+        self.assertTrue(all(0 <= r["cv_accuracy"] <= 1 and r["size_bytes"] > 0 for r in results))
+
+
+class FeatureEncoderParityTests(SimpleTestCase):
+    """
+    FeatureEncoder must produce the matrix of the old LabelEncoder + DataFrame path.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.encoders = {
+            "qualification": LabelEncoder().fit(["b.sc", "m.sc", "other"]),
+            "experience_level": LabelEncoder().fit(["entry", "mid", "senior"]),
+            "job_role": LabelEncoder().fit(["analyst", "developer"]),
+        }
+        cls.feature_cols = ["qualification", "experience_level"] + [
+            f"skill__{s}" for s in ("css", "machine learning", "python", "sql")
+        ]
+        cls.profiles = [
+            {"skills": "Python, SQL", "qualification": "M.Sc", "experience_level": "Senior"},
+            {"skills": ["css", " Python ", "", 3], "qualification": " b.sc ", "experience_level": "entry"},
+            # unseen qualification -> "other", unknown skill ignored
+            {"skills": "Machine Learning, Rust", "qualification": "PhD", "experience_level": "mid"},
+        ]
+
+    @staticmethod
+    def old_encode(profiles, feature_cols, enc):
+        def safe_encode(encoder, value, fallback):
+            try:
+                return encoder.transform([value])[0]
+            except Exception:
+                return encoder.transform([fallback])[0]
+
+        col_index = {col: j for j, col in enumerate(feature_cols)}
+        X = np.zeros((len(profiles), len(feature_cols)))
+        for row, p in enumerate(profiles):
+            X[row, col_index["qualification"]] = safe_encode(
+                enc["qualification"], str(p["qualification"]).strip().lower(), "other"
+            )
+            X[row, col_index["experience_level"]] = safe_encode(
+                enc["experience_level"], str(p["experience_level"]).strip().lower(), "other"
+            )
+            skills = p["skills"]
+            if isinstance(skills, list):
+                skills = [s.strip().lower() for s in skills if isinstance(s, str) and s.strip()]
+            else:
+                skills = [s.strip().lower() for s in str(skills).split(",") if s.strip()]
+            for skill in skills:
+                j = col_index.get(f"skill__{skill}")
+                if j is not None:
+                    X[row, j] = 1
+        return pd.DataFrame(X, columns=feature_cols).to_numpy()
+
+    def test_matches_label_encoder_path(self):
+        encoder = FeatureEncoder.from_encoders(self.feature_cols, self.encoders)
+        X, _parsed = encoder.encode(self.profiles)
+
+        np.testing.assert_array_equal(X, self.old_encode(self.profiles, self.feature_cols, self.encoders))
+
+    def test_unseen_category_without_other_raises(self):
+        encoder = FeatureEncoder.from_encoders(self.feature_cols, self.encoders)
+        with self.assertRaises(ValueError):
+            encoder.encode([{"skills": "python", "qualification": "m.sc", "experience_level": "guru"}])
+
+
+class MicroBatcherTests(SimpleTestCase):
+
+    def test_bad_profile_does_not_fail_its_batch(self):
+        calls = []
+
+        def handler(profiles, explain, with_version):
+            calls.append(len(profiles))
+            if any(p == "bad" for p in profiles):
+                raise ValueError("unseen qualification")
+            return [f"result:{p}" for p in profiles], "v1"
+
+        # a window long enough that all three submissions share one batch
+        batcher = MicroBatcher(handler, max_batch=3, max_wait_ms=1000)
+        results = {}
+
+        def submit(profile):
+            try:
+                results[profile] = batcher.submit(profile, "none")
+            except ValueError as exc:
+                results[profile] = exc
+
+        threads = [threading.Thread(target=submit, args=(p,)) for p in ("a", "bad", "b")]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+
+        self.assertEqual(calls[0], 3)
+        self.assertEqual(results["a"], ("result:a", "v1"))
+        self.assertEqual(results["b"], ("result:b", "v1"))
+        self.assertIsInstance(results["bad"], ValueError)
+        self.assertEqual(batcher.stats()["batches"], 1)
+
+
+class VocabularyTests(SimpleTestCase):
+    """
+    Skill pruning and hashing on store-layout matrices: [qualification, experience_level, skills...].
+    """
+
+    VOCAB = ["css", "docker", "python", "sql"]
+
+    def setUp(self):
+        self.X = sparse.csr_matrix(np.array([
+            [0, 1, 0, 0, 1, 1],
+            [1, 0, 0, 1, 1, 0],
+            [2, 2, 1, 0, 1, 1],
+            [0, 0, 0, 0, 1, 1],
+        ], dtype=np.float32))
+        self.y = np.array([0, 1, 0, 0])
+
+    def test_min_df_drops_rare_skills(self):
+        # document frequencies: css 1, docker 1, python 4, sql 3
+        np.testing.assert_array_equal(select_skills(self.X, self.y, min_df=2), [2, 3])
+
+    def test_max_features_keeps_most_frequent(self):
+        np.testing.assert_array_equal(select_skills(self.X, self.y, max_features=1), [2])
+        # css/docker tie: vocabulary order decides
+        np.testing.assert_array_equal(select_skills(self.X, self.y, max_features=3), [0, 2, 3])
+
+    def test_mutual_information_rank(self):
+        keep = select_skills(self.X, self.y, max_features=2, rank="mi")
+        self.assertEqual(len(keep), 2)
+        self.assertTrue(np.all(np.diff(keep) > 0))
+
+    def test_unknown_rank(self):
+        with self.assertRaises(ValueError):
+            select_skills(self.X, self.y, max_features=2, rank="chi2")
+
+    def test_keep_skill_columns_keeps_categoricals(self):
+        kept = keep_skill_columns(self.X, np.array([1, 3]))
+        np.testing.assert_array_equal(kept.toarray(), self.X.toarray()[:, [0, 1, 3, 5]])
+
+    def test_hashed_training_matches_serving_encoder(self):
+        buckets = 3
+        hashed = hash_skill_columns(self.X, self.VOCAB, buckets)
+
+        feature_cols = ["qualification", "experience_level"] + [f"skill__#{b}" for b in range(buckets)]
+        encoder = FeatureEncoder(feature_cols, ["a", "b", "c"], ["x", "y", "z"], ["r0", "r1"], hash_buckets=buckets)
+        parsed = [
+            ([self.VOCAB[j - 2] for j in row.indices if j >= 2], int(row[0, 0]), int(row[0, 1]))
+            for row in self.X
+        ]
+
+        self.assertEqual(hashed.shape, (4, 2 + buckets))
+        np.testing.assert_array_equal(hashed.toarray(), encoder.encode_parsed(parsed))
+
+    def test_unseen_skills_still_hash(self):
+        encoder = FeatureEncoder(
+            ["qualification", "experience_level", "skill__#0", "skill__#1"],
+            ["a"], ["x"], ["r0"], hash_buckets=2,
+        )
+        self.assertEqual(encoder.skill_columns(["never seen"]), [2 + hash_bucket("never seen", 2)])
+
+
+class AttributionTableTests(SimpleTestCase):
+
+    # 3 rows x (2 skills, qualification, experience), 2 classes
+    X = np.array([
+        [1, 0, 0, 1],
+        [1, 1, 1, 1],
+        [0, 1, 1, 0],
+    ], dtype=np.float64)
+    SHAP = np.arange(24, dtype=np.float64).reshape(3, 4, 2)  # (rows, features, classes)
+
+    def tables(self):
+        explainer = mock.Mock(shap_values=lambda X: self.SHAP)
+        return build_role_attributions(explainer, self.X, 2, 2, 3, n_qual=3, n_exp=2)
+
+    def test_skill_attribution_averages_rows_with_the_skill(self):
+        features = self.tables()["features"]
+
+        # skill 0 is set on rows 0 and 1, skill 1 on rows 1 and 2
+        np.testing.assert_allclose(features[1, 0], (self.SHAP[0, 0, 1] + self.SHAP[1, 0, 1]) / 2)
+        np.testing.assert_allclose(features[0, 1], (self.SHAP[1, 1, 0] + self.SHAP[2, 1, 0]) / 2)
+
+    def test_category_attribution_averages_rows_in_the_category(self):
+        qualification = self.tables()["qualification"]
+
+        np.testing.assert_allclose(qualification[0, 0], self.SHAP[0, 2, 0])
+        np.testing.assert_allclose(qualification[0, 1], (self.SHAP[1, 2, 0] + self.SHAP[2, 2, 0]) / 2)
+        # no training row had qualification 2
+        self.assertEqual(qualification[0, 2], 0)
+
+    def test_fast_contributions_look_up_present_skills_and_categories(self):
+        tables = self.tables()
+
+        contribs = fast_contributions(tables, np.array([0, 1, 1, 0.0]), 1, 2, 3, qual_code=1, exp_code=0)
+
+        np.testing.assert_allclose(contribs, [
+            0,
+            tables["features"][1, 1],
+            tables["qualification"][1, 1],
+            tables["experience_level"][1, 0],
+        ])
+
+
+class ExplainModeTests(TrainedModelMixin, SimpleTestCase):
+
+    PROFILE = {"skills": "Python, SQL, Machine Learning", "qualification": "Other", "experience_level": "Mid"}
+
+    def predict(self, explain):
+        from . import predict
+
+        with mock.patch.object(predict, "prediction_cache", None):
+            (result,) = predict.predict_job_roles([self.PROFILE], explain=explain)
+        return result
+
+    @staticmethod
+    def skill_reasons(role):
+        return {reason for reason in role["reasons"] if "aligned strongly" in reason}
+
+    def test_modes_rank_the_same_roles(self):
+        full, fast, none = (self.predict(explain) for explain in ("full", "fast", "none"))
+
+        ranked = [(role["role"], role["confidence"]) for role in full]
+        self.assertEqual([(role["role"], role["confidence"]) for role in fast], ranked)
+        self.assertEqual([(role["role"], role["confidence"]) for role in none], ranked)
+        self.assertEqual([role["reasons"] for role in none], [[], [], []])
+
+    def test_fast_reasons_name_the_same_skills_as_full(self):
+        full, fast = self.predict("full"), self.predict("fast")
+
+        self.assertEqual(self.skill_reasons(fast[0]), self.skill_reasons(full[0]))
+        self.assertEqual(len(self.skill_reasons(fast[0])), 3)
+
+    def test_model_without_attributions_falls_back_to_full(self):
+        from . import predict
+
+        with mock.patch.dict(predict.load_artifacts(), {"attributions": None}), \
+                mock.patch.object(predict, "_score_parsed", wraps=predict._score_parsed) as score:
+            self.predict("fast")
+
+        self.assertEqual(score.call_args.args[2], "full")
+
+
+class SkillHashingTests(TrainedModelMixin, SimpleTestCase):
+
+    model_settings = {"ML_SKILL_HASH_BUCKETS": 16}
+
+    @staticmethod
+    def colliding_skill(skill, buckets):
+        # an unseen skill that lands in the same bucket
+        target = hash_bucket(skill, buckets)
+        return next(
+            name for name in (f"zz{i}" for i in range(10000))
+            if hash_bucket(name, buckets) == target
+        )
+
+    def test_cache_keeps_colliding_skills_apart(self):
+        from . import predict
+
+        other = self.colliding_skill("python", 16)
+        profile = {"qualification": "Other", "experience_level": "Mid"}
+
+        with mock.patch.object(predict, "prediction_cache", PredictionCache(max_size=100, ttl=60)):
+            (first,) = predict.predict_job_roles([{"skills": "python, sql", **profile}], explain="fast")
+            (second,) = predict.predict_job_roles([{"skills": f"{other}, sql", **profile}], explain="fast")
+            hits = predict.prediction_cache.stats()["hits"]
+
+        self.assertEqual(hits, 0)
+        self.assertIn("python", " ".join(r for role in first for r in role["reasons"]))
+        second_reasons = " ".join(r for role in second for r in role["reasons"])
+        self.assertNotIn("python", second_reasons)
+        # same columns, so the same roles and confidences
+        self.assertEqual(
+            [(r["role"], r["confidence"]) for r in first],
+            [(r["role"], r["confidence"]) for r in second],
+        )
+
+
+def run_explanations_inline():
+    """
+    Patch ml.tasks so submitted explanations run right away on the test's
+    own DB connection.
+    """
+    from . import tasks
+
+    return mock.patch.multiple(
+        tasks,
+        _executor=mock.Mock(submit=lambda fn, *args: fn(*args)),
+        connection=mock.Mock(),
+    )
+
+
+class PredictViewTests(TrainedModelMixin, TestCase):
+
+    PROFILE = {"skills": "Python, SQL, Machine Learning", "qualification": "Other", "experience_level": "Mid"}
+
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user("user@example.com", "User", "pw")
+        self.admin = User.objects.create_superuser("admin@example.com", "Admin", "pw")
+        self.client = APIClient()
+
+    def post(self, path, data, user=None):
+        self.client.force_authenticate(user or self.user)
+        return self.client.post(path, data, format="json")
+
+    def test_predict_saves_top_role_with_version(self):
+        response = self.post("/api/ml/predict/", {**self.PROFILE, "explain": "fast"})
+
+        self.assertEqual(response.status_code, 200)
+        prediction = Prediction.objects.get(id=response.data["prediction_id"])
+        self.assertEqual(prediction.predicted_roles, response.data["predicted_role"][0]["role"])
+        self.assertEqual(prediction.model_version, artifacts.read_current_version())
+
+    def test_predict_unseen_category_is_400(self):
+        response = self.post("/api/ml/predict/", {**self.PROFILE, "experience_level": "Guru"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("experience_level", response.data["error"])
+        self.assertFalse(Prediction.objects.exists())
+
+    def test_batch_scores_valid_profiles_in_one_call(self):
+        from . import predict
+
+        profiles = [self.PROFILE, {**self.PROFILE, "experience_level": "Guru"}, {**self.PROFILE, "skills": "CSS, React"}]
+
+        with mock.patch.object(predict, "prediction_cache", None), \
+                mock.patch.object(predict, "_score_parsed", wraps=predict._score_parsed) as score:
+            response = self.post("/api/ml/predict/batch/", {"profiles": profiles, "explain": "fast"}, self.admin)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(score.call_count, 1)
+        self.assertEqual(len(score.call_args.args[1]), 2)
+
+        results = response.data["results"]
+        self.assertEqual(len(results[0]["predicted_role"]), 3)
+        self.assertEqual(results[1], {"prediction_id": None, "error": results[1]["error"]})
+        self.assertIn("guru", results[1]["error"])
+        self.assertEqual(len(results[2]["predicted_role"]), 3)
+
+    def test_batch_save_skips_failed_profiles(self):
+        profiles = [
+            {**self.PROFILE, "user_id": self.user.id},
+            {**self.PROFILE, "experience_level": "Guru", "user_id": self.user.id},
+        ]
+        response = self.post("/api/ml/predict/batch/", {"profiles": profiles, "save": True}, self.admin)
+
+        self.assertEqual(response.status_code, 200)
+        saved, failed = response.data["results"]
+        self.assertIsNone(failed["prediction_id"])
+        self.assertEqual(
+            list(Prediction.objects.filter(user=self.user).values_list("id", flat=True)),
+            [saved["prediction_id"]],
+        )
+
+    def test_batch_save_flag_is_parsed(self):
+        response = self.post("/api/ml/predict/batch/", {"profiles": [self.PROFILE], "save": "false"}, self.admin)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data["results"][0]["prediction_id"])
+        self.assertFalse(Prediction.objects.exists())
+
+    def test_batch_is_admin_only(self):
+        response = self.post("/api/ml/predict/batch/", {"profiles": [self.PROFILE]})
+        self.assertEqual(response.status_code, 403)
+
+
+class DeferredExplanationTests(TrainedModelMixin, TestCase):
+
+    PROFILE = {**PredictViewTests.PROFILE, "explain": "deferred"}
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("user@example.com", "User", "pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def predict(self):
+        with run_explanations_inline(), self.captureOnCommitCallbacks(execute=True):
+            return self.client.post("/api/ml/predict/", self.PROFILE, format="json")
+
+    def explanation(self, prediction_id):
+        return self.client.get(f"/api/ml/prediction/{prediction_id}/explanation/")
+
+    def test_roles_now_reasons_once_ready(self):
+        response = self.predict()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["explanation_status"], "PENDING")
+        self.assertEqual([role["reasons"] for role in response.data["predicted_role"]], [[], [], []])
+
+        explained = self.explanation(response.data["prediction_id"])
+        self.assertEqual(explained.data["status"], "READY")
+        self.assertEqual(
+            [(role["role"], role["confidence"]) for role in explained.data["predicted_role"]],
+            [(role["role"], role["confidence"]) for role in response.data["predicted_role"]],
+        )
+        self.assertTrue(all(role["reasons"] for role in explained.data["predicted_role"]))
+
+    def test_pending_until_the_worker_runs(self):
+        with mock.patch("ml.views.submit_explanation") as submit, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/ml/predict/", self.PROFILE, format="json")
+
+        submit.assert_called_once()
+        self.assertEqual(self.explanation(response.data["prediction_id"]).data["status"], "PENDING")
+
+    def test_failed_explanation_reports_the_error(self):
+        from . import inference
+
+        score = inference.predict_job_role
+
+        def explain_fails(*args, explain, **kwargs):
+            # the request ranks roles with explain="none"; only the background pass fails
+            if explain != "none":
+                raise RuntimeError("model went away")
+            return score(*args, explain=explain, **kwargs)
+
+        with mock.patch.object(inference, "predict_job_role", explain_fails):
+            response = self.predict()
+
+        explained = self.explanation(response.data["prediction_id"])
+        self.assertEqual(explained.data["status"], "FAILED")
+        self.assertEqual(explained.data["error"], "model went away")
+
+    def test_other_users_explanations_are_hidden(self):
+        response = self.predict()
+
+        self.client.force_authenticate(get_user_model().objects.create_user("other@example.com", "Other", "pw"))
+        self.assertEqual(self.explanation(response.data["prediction_id"]).status_code, 404)
+
+
+def run_training_inline(lock_path):
+    """
+    Patch ml.tasks so submitted training jobs run right away on the test's
+    own DB connection, without the heartbeat thread.
+    """
+    from . import tasks
+
+    def submit(fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    return mock.patch.multiple(
+        tasks,
+        _train_executor=mock.Mock(submit=submit),
+        _start_heartbeat=mock.Mock(),
+        connection=mock.Mock(),
+        TRAIN_LOCK_PATH=lock_path,
+    )
+
+
+class TrainingJobTests(TestCase):
+
+    def setUp(self):
+        self.model_dir = isolated_model_dir(self.addCleanup)
+        override = override_settings(ML_TRAIN_UPLOAD_DIR=os.path.join(self.model_dir, "uploads"))
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_superuser("admin@example.com", "Admin", "pw"))
+
+    def train(self, csv_bytes):
+        upload = SimpleUploadedFile("dataset.csv", csv_bytes, content_type="text/csv")
+        with run_training_inline(os.path.join(self.model_dir, "train.lock")), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/ml/admin/train/", {"dataset": upload}, format="multipart")
+        return response, self.client.get(f"/api/ml/admin/train/{response.data['job_id']}/").data
+
+    def test_job_publishes_a_version(self):
+        with open(sample_dataset(os.path.join(self.model_dir, "dataset.csv")), "rb") as f:
+            response, job = self.train(f.read())
+
+        self.assertEqual((response.status_code, response.data["status"]), (202, "QUEUED"))
+        self.assertEqual((job["status"], job["progress"]), ("SUCCEEDED", 100))
+        self.assertEqual(job["version"], artifacts.read_current_version())
+        # the upload is removed once the job is done
+        self.assertEqual(os.listdir(settings.ML_TRAIN_UPLOAD_DIR), [])
+
+    def test_bad_dataset_fails_the_job(self):
+        response, job = self.train(b"not,a,dataset\n1,2,3\n")
+
+        self.assertEqual(job["status"], "FAILED")
+        self.assertTrue(job["error"])
+        self.assertIsNone(artifacts.read_current())
+        self.assertEqual(os.listdir(settings.ML_TRAIN_UPLOAD_DIR), [])
+
+    def test_training_lock_is_exclusive(self):
+        from . import tasks
+
+        acquired = threading.Event()
+
+        def second_trainer():
+            with tasks.training_lock():
+                acquired.set()
+
+        with mock.patch.object(tasks, "TRAIN_LOCK_PATH", os.path.join(self.model_dir, "train.lock")):
+            with tasks.training_lock():
+                thread = threading.Thread(target=second_trainer)
+                thread.start()
+                self.assertFalse(acquired.wait(0.2))
+            self.assertTrue(acquired.wait(5))
+            thread.join()
+
+    def test_status_fails_jobs_whose_worker_stopped(self):
+        stale_at = timezone.now() - timedelta(seconds=settings.ML_TRAIN_STALE_SECONDS + 1)
+        stale = TrainingJob.objects.create(status="RUNNING", heartbeat_at=stale_at)
+        queued = TrainingJob.objects.create(status="QUEUED", heartbeat_at=timezone.now())
+        done = TrainingJob.objects.create(status="SUCCEEDED", heartbeat_at=stale_at)
+
+        response = self.client.get(f"/api/ml/admin/train/{queued.id}/")
+
+        self.assertEqual(response.data["status"], "QUEUED")
+        self.assertEqual(
+            dict(TrainingJob.objects.values_list("id", "status")),
+            {stale.id: "FAILED", queued.id: "QUEUED", done.id: "SUCCEEDED"},
+        )
+
+    def test_unknown_job_is_404(self):
+        self.assertEqual(self.client.get("/api/ml/admin/train/999/").status_code, 404)
+
+
+class IncrementalTrainingTests(TestCase):
+
+    def setUp(self):
+        from .train import train_model
+
+        model_dir = isolated_model_dir(self.addCleanup)
+        train_model(sample_dataset(os.path.join(model_dir, "dataset.csv")))
+        self.base_version = artifacts.read_current_version()
+
+    def approve(self, role, skills=("Python", "Statistics"), n=5):
+        user = get_user_model().objects.create_user(f"user{Prediction.objects.count()}@example.com", "User", "pw")
+        Skill.objects.bulk_create(Skill(user=user, skill_name=skill) for skill in skills)
+        Prediction.objects.bulk_create(
+            Prediction(
+                user=user, predicted_roles=role, education_qualification="Other",
+                confidence_scores=90, is_approved=True, approved_at=timezone.now(),
+            )
+            for _ in range(n)
+        )
+
+    @staticmethod
+    def serving_model():
+        from .predict import load_artifacts, load_sklearn_artifacts
+
+        return load_sklearn_artifacts(load_artifacts())["model"]
+
+    def test_feedback_adds_trees_and_keeps_classes(self):
+        from .incremental import train_incremental
+
+        base = self.serving_model()
+        self.approve("Data Scientist")
+
+        train_incremental()
+
+        model = self.serving_model()
+        self.assertEqual(len(model.estimators_), len(base.estimators_) + settings.ML_INCREMENTAL_TREES)
+        self.assertEqual(model.classes_.tolist(), base.classes_.tolist())
+        # the base version's trees are kept as they were
+        for new, old in zip(model.estimators_, base.estimators_):
+            np.testing.assert_array_equal(new.tree_.threshold, old.tree_.threshold)
+
+        metrics = artifacts.read_manifest(artifacts.read_current_version())["metrics"]
+        self.assertEqual(
+            (metrics["mode"], metrics["base_version"], metrics["feedback_rows"]),
+            ("incremental", self.base_version, 5),
+        )
+
+    def test_feedback_is_only_learned_once(self):
+        from .incremental import train_incremental
+
+        self.approve("Data Scientist")
+        train_incremental()
+
+        with self.assertRaisesMessage(ValueError, "No new approved feedback"):
+            train_incremental()
+
+    def test_unknown_roles_are_skipped(self):
+        from .incremental import train_incremental
+
+        self.approve("Astronaut")
+
+        with self.assertRaisesMessage(ValueError, "No new approved feedback"):
+            train_incremental()
+        self.assertEqual(artifacts.read_current_version(), self.base_version)
+
+    @override_settings(ML_INCREMENTAL_MAX_TREES=100)
+    def test_refuses_to_grow_past_the_tree_limit(self):
+        from .incremental import train_incremental
+
+        self.approve("Data Scientist")
+
+        with self.assertRaisesMessage(ValueError, "run a full retrain instead"):
+            train_incremental()
+
+
+class AsyncPredictViewTests(TrainedModelMixin, TestCase):
+
+    PROFILE = PredictViewTests.PROFILE
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("user@example.com", "User", "pw")
+        self.headers = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+
+    async def predict(self, data, **kwargs):
+        from . import async_views
+
+        request = AsyncRequestFactory().post("/api/ml/predict/", data, headers=self.headers, **kwargs)
+        response = await async_views.predict_view(request)
+        return response, json.loads(response.content)
+
+    async def test_json_body(self):
+        response, body = await self.predict(json.dumps(self.PROFILE), content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        prediction = await Prediction.objects.aget(id=body["prediction_id"])
+        self.assertEqual(prediction.predicted_roles, body["predicted_role"][0]["role"])
+
+    async def test_form_and_multipart_bodies_parse_like_drf(self):
+        form, _ = await self.predict(
+            "&".join(f"{key}={value}" for key, value in self.PROFILE.items()),
+            content_type="application/x-www-form-urlencoded",
+        )
+        multipart, _ = await self.predict(self.PROFILE)
+
+        self.assertEqual((form.status_code, multipart.status_code), (200, 200))
+        self.assertEqual(await Prediction.objects.acount(), 2)
+
+    async def test_malformed_json_is_400(self):
+        response, body = await self.predict("{", content_type="application/json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("JSON parse error", body["detail"])
+
+    async def test_unsupported_media_type_is_415(self):
+        response, _ = await self.predict("skills", content_type="text/plain")
+        self.assertEqual(response.status_code, 415)
+
+    async def test_unseen_category_is_400(self):
+        response, body = await self.predict(
+            json.dumps({**self.PROFILE, "experience_level": "Guru"}), content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("experience_level", body["error"])
+        self.assertFalse(await Prediction.objects.aexists())
+
+    async def test_deferred_queues_explanation(self):
+        with mock.patch("ml.async_views.submit_explanation") as submit:
+            response, body = await self.predict(
+                json.dumps({**self.PROFILE, "explain": "deferred"}), content_type="application/json"
+            )
+
+        self.assertEqual(response.status_code, 200)
+        explanation = submit.call_args.args[0]
+        self.assertEqual(explanation.prediction_id, body["prediction_id"])
+        self.assertEqual(explanation.inputs["experience_level"], "Mid")
+
+
+class ModelReportTests(TrainedModelMixin, TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_superuser("admin@example.com", "Admin", "pw"))
+
+    def test_report_describes_the_holdout(self):
+        response = self.client.get("/api/ml/admin/model-report/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["version"], artifacts.read_current_version())
+
+        report = response.data["report"]
+        self.assertEqual(report["test_rows"], 60)
+        roles = sorted(role.lower() for role in SAMPLE_ROLES)
+        self.assertEqual([row["role"] for row in report["per_role"]], roles)
+        self.assertEqual(report["confusion_matrix"]["labels"], roles)
+
+        # rows are true roles: row sums are the per-role support, the diagonal the hits
+        matrix = np.array(report["confusion_matrix"]["matrix"])
+        self.assertEqual(matrix.sum(axis=1).tolist(), [row["support"] for row in report["per_role"]])
+        self.assertAlmostEqual(report["accuracy"], np.trace(matrix) / matrix.sum(), places=4)
+        self.assertGreaterEqual(report["top3_accuracy"], report["accuracy"])
+
+    def test_admin_stats_accuracy_comes_from_the_report(self):
+        report = self.client.get("/api/ml/admin/model-report/").data["report"]
+        response = self.client.get("/api/ml/admin/stats/")
+
+        self.assertEqual(response.data["model_accuracy"], report["accuracy"])
+
+    def test_no_model_has_no_report(self):
+        isolated_model_dir(self.addCleanup)
+
+        self.assertEqual(self.client.get("/api/ml/admin/model-report/").status_code, 404)
+        self.assertIsNone(self.client.get("/api/ml/admin/stats/").data["model_accuracy"])
+
+
+class WriteBehindTests(SimpleTestCase):
+
+    def buffer(self, bulk_create, n_rows):
+        """
+        A buffer over a stand-in model whose bulk_create is the given function,
+        holding rows with ids 1..n_rows and no background thread.
+        """
+        def init(row, pk, **fields):
+            row.pk = pk
+
+        model = type("FakeRow", (), {"__init__": init, "objects": mock.Mock(bulk_create=bulk_create)})
+        buffer = WriteBehindBuffer(model, max_rows=100, max_wait_ms=10, id_block=n_rows)
+
+        for patcher in (
+            mock.patch.object(buffer, "_reserve_ids", lambda n: range(1, n + 1)),
+            mock.patch("ml.writebehind.threading.Thread"),
+            mock.patch("ml.writebehind.atexit"),
+            mock.patch("ml.writebehind.connection"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        for _ in range(n_rows):
+            buffer.add()
+        return buffer
+
+    def test_rejected_rows_are_bisected_out(self):
+        written = []
+
+        def bulk_create(rows, batch_size):
+            if {3, 6} & {row.pk for row in rows}:
+                raise IntegrityError("violates foreign key constraint")
+            written.extend(row.pk for row in rows)
+
+        buffer = self.buffer(bulk_create, 8)
+
+        with self.assertLogs("ml.writebehind", "ERROR"):
+            self.assertTrue(buffer.flush())
+
+        self.assertEqual(sorted(written), [1, 2, 4, 5, 7, 8])
+        stats = buffer.stats()
+        self.assertEqual((stats["written"], stats["dropped_rows"], stats["queued"]), (6, 2, 0))
+
+    def test_connection_error_requeues_the_batch(self):
+        written = []
+        errors = [OperationalError("server closed the connection")]
+
+        def bulk_create(rows, batch_size):
+            if errors:
+                raise errors.pop(0)
+            written.extend(row.pk for row in rows)
+
+        buffer = self.buffer(bulk_create, 4)
+
+        with self.assertLogs("ml.writebehind", "ERROR"):
+            self.assertFalse(buffer.flush())
+        self.assertEqual((buffer.stats()["queued"], buffer.stats()["failed_flushes"]), (4, 1))
+
+        self.assertTrue(buffer.flush())
+        self.assertEqual(written, [1, 2, 3, 4])
+        self.assertEqual(buffer.stats()["queued"], 0)
+
+    def test_connection_error_while_bisecting_keeps_every_row(self):
+        errors = [IntegrityError("bad row"), OperationalError("server closed the connection")]
+
+        def bulk_create(rows, batch_size):
+            if errors:
+                raise errors.pop(0)
+
+        buffer = self.buffer(bulk_create, 4)
+
+        with self.assertLogs("ml.writebehind", "ERROR"):
+            self.assertFalse(buffer.flush())
+
+        # the half that failed and the half not tried yet, in order
+        self.assertEqual([row.pk for row in buffer._rows], [1, 2, 3, 4])
+        self.assertEqual(buffer.stats()["dropped_rows"], 0)
+
+
+class FakeSidecar(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Stands in for manage.py inference_server: answers predict frames with
+    one result per profile, optionally slowly or hanging up after each reply.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, delay=0.0, close_after_reply=False):
+        self.delay = delay
+        self.close_after_reply = close_after_reply
+        self.requests = []
+        self.connections = 0
+
+        server = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                server.connections += 1
+                while True:
+                    try:
+                        message, fmt = read_frame(self.request)
+                    except (OSError, ConnectionError):
+                        return
+                    server.requests.append(message)
+                    time.sleep(server.delay)
+                    reply = {
+                        "ok": True,
+                        "results": [p["skills"] for p in message["profiles"]],
+                        "version": "v1",
+                    }
+                    if message.get("partial"):
+                        reply["errors"] = [None] * len(message["profiles"])
+                    try:
+                        self.request.sendall(encode_frame(reply, fmt))
+                    except OSError:
+                        return
+                    if server.close_after_reply:
+                        return
+
+        super().__init__(socket_path, Handler)
+
+
+class InferenceClientTests(SimpleTestCase):
+
+    def start_sidecar(self, **options):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, True)
+        self.socket_path = os.path.join(tmp, "inference.sock")
+
+        server = FakeSidecar(self.socket_path, **options)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def profiles(self, n):
+        return [{"skills": f"s{i}", "qualification": "q", "experience_level": "e"} for i in range(n)]
+
+    def test_frame_round_trip(self):
+        a, b = socket.socketpair()
+        self.addCleanup(a.close)
+        self.addCleanup(b.close)
+        message = {"op": "predict", "profiles": [{"skills": "python, sql"}], "explain": "none"}
+
+        for fmt in (b"J", b"M") if msgpack is not None else (b"J",):
+            a.sendall(encode_frame(message, fmt))
+            self.assertEqual(read_frame(b), (message, fmt))
+
+    def test_bad_frame_length(self):
+        a, b = socket.socketpair()
+        self.addCleanup(a.close)
+        self.addCleanup(b.close)
+
+        a.sendall(struct.pack("!I", 0))
+        with self.assertRaises(ConnectionError):
+            read_frame(b)
+
+    def test_batches_are_sent_in_chunks(self):
+        server = self.start_sidecar()
+        client = InferenceClient(self.socket_path, timeout=5, max_profiles=2)
+
+        results, version = client.predict(self.profiles(5), "none")
+
+        self.assertEqual(results, [f"s{i}" for i in range(5)])
+        self.assertEqual(version, "v1")
+        self.assertEqual([len(m["profiles"]) for m in server.requests], [2, 2, 1])
+        self.assertEqual(server.connections, 1)
+
+        results, errors, _version = client.predict_partial(self.profiles(3), "none")
+        self.assertEqual((len(results), errors), (3, [None, None, None]))
+
+    def test_slow_reply_is_not_resent(self):
+        server = self.start_sidecar()
+        client = InferenceClient(self.socket_path, timeout=0.2)
+        client.predict(self.profiles(1), "none")
+
+        # the kept-alive connection is reused; a read timeout must not resend the request
+        server.delay = 0.5
+        with self.assertRaises(InferenceUnavailable):
+            client.predict(self.profiles(1), "none")
+
+        self.assertEqual(len(server.requests), 2)
+
+    def test_stale_connection_is_reopened(self):
+        server = self.start_sidecar(close_after_reply=True)
+        client = InferenceClient(self.socket_path, timeout=5)
+
+        client.predict(self.profiles(1), "none")
+        time.sleep(0.05)  # let the server hang up
+        results, _version = client.predict(self.profiles(1), "none")
+
+        self.assertEqual(results, ["s0"])
+        self.assertEqual(len(server.requests), 2)
+        self.assertEqual(server.connections, 2)
+
+    def test_unreachable_sidecar(self):
+        with self.assertRaises(InferenceUnavailable):
+            InferenceClient("/nonexistent/inference.sock", timeout=1).predict(self.profiles(1), "none")
+
+
+class InferenceServerTests(TrainedModelMixin, SimpleTestCase):
+    """
+    ml.inference routed through a real InferenceHandler on a Unix socket.
+    """
+
+    def setUp(self):
+        from . import inference
+        from .inference_server import InferenceHandler, InferenceServer
+
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, True)
+        socket_path = os.path.join(tmp, "inference.sock")
+
+        server = InferenceServer(socket_path, InferenceHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        overrides = override_settings(ML_INFERENCE_SOCKET=socket_path, ML_INFERENCE_MAX_PROFILES=2)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        client = mock.patch.multiple(inference, _client=None, _down_until=0.0)
+        client.start()
+        self.addCleanup(client.stop)
+
+    def test_matches_in_process_results(self):
+        from . import inference, inference_server, predict
+
+        profiles = [
+            {"skills": skills, "qualification": "Other", "experience_level": "Entry"}
+            for skills in ("Python, SQL", "CSS, React", "Docker, Linux", "Excel")
+        ]
+        with mock.patch.object(
+            inference_server, "predict_job_roles", wraps=inference_server.predict_job_roles
+        ) as served:
+            results, version = inference.predict_job_roles(profiles, explain="fast", with_version=True)
+
+        # answered by the socket handler, two profiles per request
+        self.assertEqual(served.call_count, 2)
+        self.assertEqual(
+            (results, version),
+            predict.predict_job_roles(profiles, explain="fast", with_version=True),
+        )
+
+    def test_partial_and_passthrough_errors(self):
+        from . import inference
+
+        profiles = [
+            {"skills": "Python", "qualification": "Other", "experience_level": "Guru"},
+            {"skills": "Python", "qualification": "Other", "experience_level": "Mid"},
+        ]
+        results, errors, _version = inference.predict_job_roles_partial(profiles, explain="none")
+        self.assertIsNone(results[0])
+        self.assertIn("guru", errors[0])
+        self.assertEqual((len(results[1]), errors[1]), (3, None))
+
+        with self.assertRaises(ValueError):
+            inference.predict_job_roles(profiles, explain="none")
+        self.assertEqual(inference._down_until, 0.0)
+
+
+class AdmissionTests(SimpleTestCase):
+    """
+    In-flight slots and rate buckets are shared through flock'd files, so
+    they hold across worker processes, not just threads.
+    """
+
+    def setUp(self):
+        self.slot_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.slot_dir, True)
+
+    def hold_in_other_process(self, path):
+        """
+        Lock path from a child process until the test ends.
+        """
+        child = subprocess.Popen(
+            [sys.executable, "-c", (
+                "import fcntl, sys, time\n"
+                f"f = open({path!r}, 'a'); fcntl.flock(f, fcntl.LOCK_EX)\n"
+                "print('held', flush=True); time.sleep(60)"
+            )],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        self.addCleanup(child.wait)
+        self.addCleanup(child.kill)
+        self.assertEqual(child.stdout.readline().strip(), "held")
+
+    def test_slot_limit(self):
+        controller = AdmissionController(1, 0, 50, self.slot_dir)
+
+        slot = controller.acquire()
+        self.assertIsNotNone(slot)
+        self.assertIsNone(controller.acquire())
+        self.assertEqual(controller.stats()["rejected_queue_full"], 1)
+
+        controller.release(slot)
+        self.assertIsNotNone(controller.acquire())
+
+    def test_queued_request_times_out(self):
+        controller = AdmissionController(1, 1, 50, self.slot_dir)
+        controller.acquire()
+
+        started = time.monotonic()
+        self.assertIsNone(controller.acquire())
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+        self.assertEqual(controller.stats()["rejected_timeout"], 1)
+
+    def test_queued_request_gets_freed_slot(self):
+        controller = AdmissionController(1, 1, 2000, self.slot_dir)
+        slot = controller.acquire()
+        threading.Timer(0.05, controller.release, args=(slot,)).start()
+
+        self.assertIsNotNone(controller.acquire())
+        self.assertEqual(controller.stats()["served"], 1)
+
+    def test_slots_are_shared_between_processes(self):
+        controller = AdmissionController(1, 0, 50, self.slot_dir)
+        os.makedirs(self.slot_dir, exist_ok=True)
+        self.hold_in_other_process(os.path.join(self.slot_dir, "run-0.lock"))
+
+        self.assertIsNone(controller.acquire())
+
+    def test_no_limit_admits_everything(self):
+        controller = AdmissionController(0, 0, 50, self.slot_dir)
+        slots = [controller.acquire() for _ in range(5)]
+
+        self.assertTrue(all(slot is ADMITTED for slot in slots))
+        self.assertEqual(controller.stats()["in_flight"], 5)
+
+    def test_token_bucket_refills(self):
+        buckets = TokenBuckets(self.slot_dir)
+
+        self.assertEqual(buckets.take("user:1", rate=1, burst=2, now=100.0), 0.0)
+        self.assertEqual(buckets.take("user:1", rate=1, burst=2, now=100.0), 0.0)
+        self.assertAlmostEqual(buckets.take("user:1", rate=1, burst=2, now=100.5), 0.5)
+        self.assertEqual(buckets.take("user:1", rate=1, burst=2, now=101.0), 0.0)
+        # other users have their own bucket
+        self.assertEqual(buckets.take("user:2", rate=1, burst=2, now=101.0), 0.0)
+
+    def test_token_bucket_is_shared_between_processes(self):
+        # a second worker process empties the bucket...
+        code = (
+            "import django; django.setup()\n"
+            "from ml.admission import TokenBuckets\n"
+            f"buckets = TokenBuckets({self.slot_dir!r})\n"
+            "print([buckets.take('user:1', rate=0.001, burst=3) for _ in range(3)])"
+        )
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "backend.settings")}
+        proc = subprocess.run(
+            [sys.executable, "-c", code], cwd=settings.BASE_DIR, env=env,
+            capture_output=True, text=True, check=True,
+        )
+        self.assertEqual(proc.stdout.strip(), "[0.0, 0.0, 0.0]")
+
+        # ...so this one is throttled
+        self.assertGreater(TokenBuckets(self.slot_dir).take("user:1", rate=0.001, burst=3), 0)
+
+    def test_token_bucket_is_atomic_across_threads(self):
+        buckets = TokenBuckets(self.slot_dir)
+        waits = []
+
+        def take():
+            waits.append(buckets.take("user:1", rate=0.001, burst=10))
+
+        threads = [threading.Thread(target=take) for _ in range(30)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(10)
+
+        self.assertEqual(waits.count(0.0), 10)
+
+    @override_settings(ML_PREDICT_RATE=1.0, ML_PREDICT_BURST=1)
+    def test_throttle_answers_with_wait(self):
+        request = mock.Mock(user=mock.Mock(pk=7, is_authenticated=True))
+
+        with mock.patch("ml.admission.rate_buckets", TokenBuckets(self.slot_dir)):
+            throttle = PredictRateThrottle()
+            self.assertTrue(throttle.allow_request(request, None))
+            self.assertFalse(throttle.allow_request(request, None))
+            self.assertGreater(throttle.wait(), 0.9)
+
+
+class MappedServingTests(TrainedModelMixin, TestCase):
+    """
+    With the default settings, predictions and deferred reasons are served
+    from the memory-mapped bundle; the pickled sklearn forest and SHAP
+    explainer are loaded only when explain="full" is asked for.
+    """
+
+    PROFILE = {"skills": "Python, SQL", "qualification": "Other", "experience_level": "Mid"}
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user("user@example.com", "User", "pw"))
+
+    def test_defaults_do_not_unpickle_the_model(self):
+        from .predict import load_artifacts
+
+        with run_explanations_inline(), self.captureOnCommitCallbacks(execute=True):
+            plain = self.client.post("/api/ml/predict/", self.PROFILE, format="json")
+            deferred = self.client.post("/api/ml/predict/", {**self.PROFILE, "explain": "deferred"}, format="json")
+
+        self.assertEqual((plain.status_code, deferred.status_code), (200, 200))
+        self.assertTrue(all(role["reasons"] for role in plain.data["predicted_role"]))
+        self.assertEqual(PredictionExplanation.objects.get().status, "READY")
+        self.assertNotIn("sklearn", load_artifacts())
+
+        self.client.post("/api/ml/predict/", {**self.PROFILE, "explain": "full"}, format="json")
+        self.assertIn("sklearn", load_artifacts())
+
+
+class ImportBudgetTests(SimpleTestCase):
+    """
+    django.setup() + URL resolution must not pull in the ML stack and must
+    stay within an import-time budget (cold start, manage.py commands).
+    """
+
+    HEAVY_MODULES = ("numpy", "pandas", "scipy", "sklearn", "shap", "numba")
+    BUDGET_SECONDS = 1.5
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        code = (
+            "import django; django.setup(); "
+            "from django.urls import resolve; resolve('/api/accounts/myprofile/')"
+        )
+        env = dict(os.environ)
+        env.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        # "import time: <self us> | <cumulative us> | <module>"
+        cls.self_us = {}
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "self [us]" in line:
+                continue
+            self_us, _cumulative, module = line[len("import time:"):].split("|")
+            cls.self_us[module.strip()] = int(self_us)
+
+    def test_no_heavy_ml_imports(self):
+        heavy = sorted(
+            module for module in self.self_us
+            if module.split(".")[0] in self.HEAVY_MODULES
+        )
+        self.assertEqual(heavy, [])
+
+    def test_import_time_budget(self):
+        total = sum(self.self_us.values()) / 1e6
+        self.assertLess(total, self.BUDGET_SECONDS)
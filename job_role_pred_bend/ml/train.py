@@ -1,117 +1,218 @@
-import os
-import json
-import pandas as pd
 import pickle
+import time
+
+import numpy as np
 import shap
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import LabelEncoder
 from django.conf import settings
 
-# Where model + metadata live
-MODEL_PATH = settings.ML_MODEL_PATH
-METADATA_PATH = os.path.join(os.path.dirname(MODEL_PATH), "metadata.json")
-
-
-def build_skill_vocab(series):
-    vocab = set()
-    for s in series.fillna(""):
-        skills = [x.strip().lower() for x in s.split(",") if x.strip()]
-        vocab.update(skills)
-    return sorted(vocab)
-
-
-def train_model(dataset_path):
-    df = pd.read_csv(dataset_path)
+from .artifacts import publish_model
+from .evaluate import evaluation_report
+from .explain import build_role_attributions
+from .forest import FlatForest
+from .ingest import cached_feature_store, deduplicate, load_feature_store
+from .sweep import run_sweep
+from .vocab import hash_skill_columns, keep_skill_columns, select_skills
+
+
+def train_model(dataset_path, progress=None):
+    """
+    Train and publish a new model version from a candidate CSV.
+
+    progress(stage, percent), if given, is called as training moves on.
+    """
+    report = progress or (lambda stage, percent: None)
+
+    # stream the CSV chunk by chunk into an on-disk sparse store, then train from it;
+    # the raw text is never fully in memory, only the encoded CSR matrix. Stores are
+    # cached by dataset content hash, so re-uploading a CSV skips parsing entirely.
+    report("ingest", 5)
+    ingest_started = time.perf_counter()
+    store_dir, cache_hit = cached_feature_store(
+        dataset_path,
+        settings.ML_FEATURE_STORE_DIR,
+        settings.ML_TRAIN_CHUNK_ROWS,
+        keep=settings.ML_FEATURE_STORE_KEEP,
+    )
+    X, y, store = load_feature_store(store_dir)
+    ingest_seconds = time.perf_counter() - ingest_started
 
-    # remove id column if present
-    if "candidate_id" in df.columns:
-        df = df.drop("candidate_id", axis=1)
+    skill_vocab = store["skill_vocab"]
 
-    # --- capture ORIGINAL casing for metadata (frontend display) ---
-    qualifications_unique = sorted(df["qualification"].dropna().unique())
-    exp_unique = sorted(df["experience_level"].dropna().unique())
+    # encoders, fitted on the label sets collected while streaming
+    le_qualification = LabelEncoder().fit(store["classes"]["qualification"])
+    le_experience = LabelEncoder().fit(store["classes"]["experience_level"])
+    le_job = LabelEncoder().fit(store["classes"]["job_role"])
 
-    skill_vocab_frontend = sorted(
-        set(
-            s.strip()
-            for row in df["skills"].fillna("")
-            for s in row.split(",")
-            if s.strip()
-        )
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42
     )
 
-    # --- normalize ONLY for model training ---
-    for col in df.columns:
-        if df[col].dtype == "object":
-            df[col] = df[col].str.strip().str.lower()
-
-    # lowercase skills vocabulary for the model
-    skill_vocab = build_skill_vocab(df["skills"])
-
-    # convert skills to multi-hot features
-    skill_cols = {}
-    for skill in skill_vocab:
-        skill_cols[f"skill__{skill}"] = df["skills"].apply(
-            lambda x: 1 if skill in [s.strip().lower() for s in str(x).split(",")] else 0
+    # bound the feature space: a fixed number of hashed buckets, or a pruned vocabulary
+    buckets = settings.ML_SKILL_HASH_BUCKETS
+    if buckets:
+        X_train = hash_skill_columns(X_train, skill_vocab, buckets)
+        X_test = hash_skill_columns(X_test, skill_vocab, buckets)
+        skill_cols = [f"skill__#{b}" for b in range(buckets)]
+        skill_encoding = {"mode": "hash", "buckets": buckets}
+    else:
+        keep = select_skills(
+            X_train,
+            y_train,
+            min_df=settings.ML_VOCAB_MIN_DF,
+            max_features=settings.ML_VOCAB_MAX_FEATURES,
+            rank=settings.ML_VOCAB_RANK,
         )
+        X_train = keep_skill_columns(X_train, keep)
+        X_test = keep_skill_columns(X_test, keep)
+        skill_encoding = {"mode": "vocab", "seen": len(skill_vocab), "kept": len(keep)}
+        skill_vocab = [skill_vocab[j] for j in keep]
+        skill_cols = [f"skill__{skill}" for skill in skill_vocab]
+
+    feature_cols = ["qualification", "experience_level"] + skill_cols
+
+    # identical normalized rows become one weighted row; the holdout split above is untouched
+    train_rows = X_train.shape[0]
+    sample_weight = None
+    if settings.ML_TRAIN_DEDUPLICATE:
+        X_train, y_train, sample_weight = deduplicate(X_train, y_train)
+
+    params = {"n_estimators": 150}
+    sweep_results = None
+
+    if settings.ML_SWEEP_ENABLED:
+        report("sweep", 10)
+        params, sweep_results = run_sweep(
+            X_train,
+            y_train,
+            n_folds=settings.ML_SWEEP_FOLDS,
+            latency_budget_ms=settings.ML_SWEEP_LATENCY_BUDGET_MS,
+            workers=settings.ML_SWEEP_WORKERS,
+            sample_weight=sample_weight,
+        )
+
+    # the forest trains on the CSR matrix directly, no dense copy
+    report("fit", 30)
+    fit_started = time.perf_counter()
+    model = RandomForestClassifier(random_state=42, **params)
+    model.fit(X_train, y_train, sample_weight=sample_weight)
+    fit_seconds = time.perf_counter() - fit_started
+
+    report("publish", 90)
+    publish_trained_model(
+        model,
+        feature_cols,
+        skill_vocab,
+        {
+            "qualification": le_qualification,
+            "experience_level": le_experience,
+            "job_role": le_job,
+        },
+        # --- save metadata for frontend (keeps ORIGINAL case) ---
+        store["metadata"],
+        train_rows=(X_train, y_train),
+        holdout=_head(X_test, y_test, settings.ML_HOLDOUT_ROWS),
+        evaluate_on=(X_test, y_test),
+        replay=replay_sample(X_train, y_train, settings.ML_REPLAY_ROWS_PER_ROLE),
+        fit_seconds=fit_seconds,
+        skill_encoding=skill_encoding,
+        metrics={
+            "mode": "full",
+            "feature_cache": "hit" if cache_hit else "miss",
+            "ingest_seconds": round(ingest_seconds, 3),
+            "train_rows": int(train_rows),
+            **({"unique_rows": int(X_train.shape[0])} if sample_weight is not None else {}),
+            "test_rows": int(X_test.shape[0]),
+            "params": params,
+            **({"sweep": sweep_results} if sweep_results is not None else {}),
+        },
+    )
 
-    df = pd.concat([df, pd.DataFrame(skill_cols)], axis=1)
+    return "Model trained & saved successfully!"
 
-    # encoders
-    le_qualification = LabelEncoder()
-    le_experience = LabelEncoder()
-    le_job = LabelEncoder()
 
-    df["qualification"] = le_qualification.fit_transform(df["qualification"].fillna(""))
-    df["experience_level"] = le_experience.fit_transform(df["experience_level"].fillna(""))
+def _head(X, y, n):
+    return X[:n], y[:n]
 
-    # target
-    df["job_role"] = le_job.fit_transform(df["job_role"])
 
-    feature_cols = (
-        ["qualification", "experience_level"]
-        + [c for c in df.columns if c.startswith("skill__")]
-    )
+def replay_sample(X, y, per_role):
+    """
+    Up to per_role training rows of every role, kept with the version so an
+    incremental fit always sees all classes.
+    """
+    rng = np.random.default_rng(42)
+    rows = np.concatenate([
+        rng.permutation(np.flatnonzero(y == code))[:per_role]
+        for code in np.unique(y)
+    ])
+    rows.sort()
+    return X[rows], y[rows]
 
-    X = df[feature_cols]
-    y = df["job_role"]
 
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42
-    )
+def publish_trained_model(model, feature_cols, skill_vocab, encoders, metadata,
+                          train_rows, holdout, replay, fit_seconds, metrics,
+                          skill_encoding=None, evaluate_on=None):
+    """
+    Everything after the fit: SHAP explainer, attribution tables, holdout
+    evaluation and the version bundle. Returns the published version.
 
-    model = RandomForestClassifier(n_estimators=150, random_state=42)
-    model.fit(X_train, y_train)
+    holdout is the (capped) sample saved with the version; the report is
+    computed on evaluate_on, the full test split, when the caller has one,
+    and is labelled as sampled otherwise (incremental fits).
+    """
+    X_train, _y_train = train_rows
 
     # SHAP explainer for interpretability
     explainer = shap.TreeExplainer(model)
 
+    # per-role attribution tables for explain="fast", from exact SHAP on a training sample
+    rng = np.random.default_rng(42)
+    n_sample = min(settings.ML_ATTRIBUTION_SAMPLE_ROWS, X_train.shape[0])
+    sample_rows = rng.choice(X_train.shape[0], size=n_sample, replace=False)
+    attributions = build_role_attributions(
+        explainer,
+        X_train[sample_rows].toarray(),
+        n_classes=len(model.classes_),
+        qual_col=feature_cols.index("qualification"),
+        exp_col=feature_cols.index("experience_level"),
+        n_qual=len(encoders["qualification"].classes_),
+        n_exp=len(encoders["experience_level"].classes_),
+    )
 
     # save model + encoders
     artifacts = {
         "model": model,
         "feature_cols": feature_cols,
         "skill_vocab": skill_vocab,
+        "skill_encoding": skill_encoding or {"mode": "vocab"},
         "explainer": explainer,
-        "encoders": {
-            "qualification": le_qualification,
-            "experience_level": le_experience,
-            "job_role": le_job,
-        },
+        "attributions": attributions,
+        "encoders": encoders,
     }
 
-    with open(MODEL_PATH, "wb") as f:
-        pickle.dump(artifacts, f)
-
-    # --- save metadata for frontend (keeps ORIGINAL case) ---
-    metadata = {
-        "qualification": qualifications_unique,
-        "experience_level": exp_unique,
-        "skills": skill_vocab_frontend,
+    # holdout evaluation, stored with the version and served from memory
+    X_eval, y_eval = evaluate_on if evaluate_on is not None else holdout
+    evaluation = evaluation_report(
+        FlatForest.from_sklearn(model), X_eval, y_eval,
+        list(encoders["job_role"].classes_), fit_seconds,
+    )
+    evaluation["holdout"] = "full" if evaluate_on is not None else "sample"
+
+    # summary shown in the model registry
+    metrics = {
+        "accuracy": evaluation["accuracy"],
+        "top3_accuracy": evaluation["top3_accuracy"],
+        "fit_seconds": round(fit_seconds, 2),
+        "n_trees": len(model.estimators_),
+        "n_features": len(feature_cols),
+        "skill_encoding": skill_encoding or {"mode": "vocab"},
+        **metrics,
     }
 
-    with open(METADATA_PATH, "w", encoding="utf-8") as f:
-        json.dump(metadata, f, indent=2)
-
-    return "Model trained & saved successfully!"
+    # new version bundle + atomic pointer flip: ml.predict reloads on its next request
+    return publish_model(
+        artifacts, pickle.dumps(artifacts), metadata, metrics, evaluation,
+        samples={"holdout": holdout, "replay": replay},
+    )
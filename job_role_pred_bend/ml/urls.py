@@ -1,14 +1,27 @@
+from django.conf import settings
 from django.urls import path
-from .views import train_view, predict_view, metadata_view, dash_prediction_data, admin_stats, recent_activity, prediction_feedback, education_job_trends
+from .views import train_view, train_incremental_view, training_job_status, model_versions, activate_model_version, rollback_model_version, predict_view, predict_batch_view, metadata_view, dash_prediction_data, admin_stats, model_report, recent_activity, prediction_feedback, prediction_explanation, education_job_trends, health_ready
+
+if settings.ML_ASYNC_VIEWS:
+    from .async_views import predict_view, metadata_view
 
 urlpatterns = [
     path("admin/train/", train_view),
+    path("admin/train/incremental/", train_incremental_view),
+    path("admin/train/<int:job_id>/", training_job_status),
+    path("admin/models/", model_versions),
+    path("admin/models/rollback/", rollback_model_version),
+    path("admin/models/<str:version>/activate/", activate_model_version),
     path("predict/", predict_view),
+    path("predict/batch/", predict_batch_view),
     path("metadata/", metadata_view, name="metadata"),
     path("dash-prediction-data/", dash_prediction_data, name="dash-prediction-data"),
     path('admin/stats/', admin_stats),
+    path('admin/model-report/', model_report),
     path('admin/recent/', recent_activity),
     path("prediction/<int:pk>/feedback/", prediction_feedback),
+    path("prediction/<int:pk>/explanation/", prediction_explanation),
     path("education-job-trends/", education_job_trends),
+    path("health/ready/", health_ready),
 
 ]
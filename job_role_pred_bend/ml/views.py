@@ -1,5 +1,5 @@
 from django.shortcuts import render
-from rest_framework.decorators import api_view, permission_classes, parser_classes
+from rest_framework.decorators import api_view, permission_classes, parser_classes, authentication_classes, throttle_classes
 from rest_framework.permissions import IsAdminUser, AllowAny
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
@@ -9,13 +9,28 @@ from accounts.models import Prediction
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.db.models import Count
+from django.db import transaction
 
 import os
 import json
+import uuid
 from accounts.models import Education, Skill
 
-from .train import train_model
-from .predict import predict_job_role
+from .models import PredictionExplanation, TrainingJob
+from .tasks import fail_stale_jobs, submit_explanation, submit_training
+from .result_cache import prediction_cache
+from .admission import PredictRateThrottle, admission, admission_controlled
+from .writebehind import prediction_writer
+from .warmup import readiness
+
+# ml.train / ml.predict pull in numpy, pandas, sklearn, shap and numba; they are
+# imported inside the views that need them so workers serving only
+# /api/accounts/ traffic and manage.py commands never pay for them.
+
+# same as ml.explain.EXPLAIN_MODES, spelled out to keep numpy out of this import
+EXPLAIN_MODES = ("full", "fast", "none")
+# predict_view can also hand the reasons to a background worker
+PREDICT_EXPLAIN_MODES = EXPLAIN_MODES + ("deferred",)
 
 
 # --- TRAIN (ADMIN ONLY + CSV upload) ---
@@ -28,58 +43,358 @@ def train_view(request):
     if not dataset:
         return Response({"error": "No dataset uploaded"}, status=400)
 
-    # Delete old model if exists
-    if os.path.exists(settings.ML_MODEL_PATH):
-        os.remove(settings.ML_MODEL_PATH)
+    # keep the upload on disk for the worker; the current model keeps serving
+    # until the job publishes a new version
+    os.makedirs(settings.ML_TRAIN_UPLOAD_DIR, exist_ok=True)
+    dataset_path = os.path.join(settings.ML_TRAIN_UPLOAD_DIR, f"{uuid.uuid4().hex}.csv")
+    with open(dataset_path, "wb") as f:
+        for chunk in dataset.chunks():
+            f.write(chunk)
+
+    job = TrainingJob.objects.create(
+        dataset_path=dataset_path, created_by=request.user, heartbeat_at=timezone.now()
+    )
+    transaction.on_commit(lambda: submit_training(job))
+
+    return Response(_training_job_data(job), status=202)
+
+
+# --- INCREMENTAL TRAIN FROM FEEDBACK (ADMIN ONLY) ---
+@api_view(["POST"])
+@permission_classes([IsAdminUser])
+def train_incremental_view(request):
+    job = TrainingJob.objects.create(
+        mode="incremental", created_by=request.user, heartbeat_at=timezone.now()
+    )
+    transaction.on_commit(lambda: submit_training(job))
+
+    return Response(_training_job_data(job), status=202)
+
 
-    if os.path.exists(settings.ML_METADATA_PATH):
-        os.remove(settings.ML_METADATA_PATH)
+def _training_job_data(job):
+    return {
+        "job_id": job.id,
+        "mode": job.mode,
+        "status": job.status,
+        "stage": job.stage,
+        "progress": job.progress,
+        "version": job.version or None,
+        "message": job.message,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "worker": job.worker,
+        "heartbeat_at": job.heartbeat_at,
+    }
 
-    msg = train_model(dataset)
-    return Response({"message": msg})
+
+# -----------------------------
+# Training job status (Admin, poll until SUCCEEDED / FAILED)
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def training_job_status(request, job_id):
+    # jobs orphaned by a worker restart would otherwise stay QUEUED/RUNNING forever
+    fail_stale_jobs()
+
+    try:
+        job = TrainingJob.objects.get(id=job_id)
+    except TrainingJob.DoesNotExist:
+        return Response({"error": "Training job not found"}, status=404)
+
+    return Response(_training_job_data(job))
 
 
 # --- PREDICT (PUBLIC) ---
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
+@throttle_classes([PredictRateThrottle])
+@admission_controlled
 def predict_view(request):
-    skills = request.data.get("skills")
-    qualification = request.data.get("qualification")
-    experience = request.data.get("experience_level")
+    inputs, error = predict_inputs(request.data)
+    if error:
+        return Response(*error)
+
+    scored, error = score_inputs(inputs)
+    if error:
+        return Response(*error)
+    job, version = scored
+
+    fields, error = prediction_fields(request.user, inputs, job, version)
+    if error:
+        return Response(*error)
+
+    # write-behind: the id is reserved now, the row is inserted with the next batch.
+    # A deferred explanation references the row, so that one is written right away.
+    if buffer_prediction(inputs):
+        prediction = prediction_writer.add(**fields)
+    else:
+        prediction = Prediction.objects.create(**fields)
+
+    explanation = None
+    if inputs["deferred"]:
+        explanation = PredictionExplanation.objects.create(
+            prediction=prediction, inputs=explanation_inputs(inputs)
+        )
+        transaction.on_commit(lambda: submit_explanation(explanation))
+
+    return Response(predict_payload(prediction, job, explanation))
+
+
+# Request handling shared with the async predict_view / metadata_view (ml/async_views.py);
+# error results are (body, status)
+
+def predict_inputs(data):
+    """
+    Validated predict body as (inputs, None), or (None, error).
+    """
+    inputs = {
+        "skills": data.get("skills"),
+        "qualification": data.get("qualification"),
+        "experience_level": data.get("experience_level"),
+        "explain": data.get("explain", settings.ML_EXPLAIN_DEFAULT),
+    }
+
+    if not (inputs["skills"] and inputs["qualification"] and inputs["experience_level"]):
+        return None, ({"error": "Missing fields"}, 400)
+
+    if inputs["explain"] not in PREDICT_EXPLAIN_MODES:
+        return None, ({"error": f"explain must be one of {', '.join(PREDICT_EXPLAIN_MODES)}"}, 400)
 
-    if not (skills and qualification and experience):
-        return Response({"error": "Missing fields"}, status=400)
+    # deferred: rank roles now, compute reasons in the background
+    inputs["deferred"] = inputs["explain"] == "deferred"
+    return inputs, None
 
-    job = predict_job_role(skills, qualification, experience)
 
+def score_inputs(inputs):
+    """
+    ((top-3 roles, model version), None) for validated inputs, or (None, error)
+    when the model can't encode them (unseen qualification / experience level).
+    CPU-bound.
+    """
+    from .inference import predict_job_role
+
+    try:
+        return predict_job_role(
+            inputs["skills"], inputs["qualification"], inputs["experience_level"],
+            explain="none" if inputs["deferred"] else inputs["explain"],
+            with_version=True,
+        ), None
+    except ValueError as exc:
+        return None, ({"error": str(exc)}, 400)
+
+
+def prediction_fields(user, inputs, job, version):
+    """
+    Prediction row for the top role as (fields, None), or (None, error).
+    """
     # Extract the first prediction result
     raw_prediction = job[0]
-    
+
     # Validate prediction structure
     if not isinstance(raw_prediction, dict) or 'role' not in raw_prediction:
-        return Response({"error": "Invalid prediction format"}, status=500)
-    
+        return None, ({"error": "Invalid prediction format"}, 500)
+
     clean_role = raw_prediction['role'].strip()[:255]
     confidence = float(raw_prediction.get('confidence', 0.0))
 
     if confidence == 0.0:
-        return Response({"error": "Prediction confidence too low"}, status=400)
+        return None, ({"error": "Prediction confidence too low"}, 400)
 
     # Use the qualification parameter sent from frontend
-    degree = qualification.strip()[:100]
+    degree = inputs["qualification"].strip()[:100]
 
-    prediction = Prediction.objects.create(
-        user=request.user,
+    return dict(
+        user=user,
         predicted_roles=clean_role,
         education_qualification=degree,
-        confidence_scores=confidence
-    )
+        confidence_scores=confidence,
+        model_version=version,
+    ), None
 
-    
-    return Response({
+
+def buffer_prediction(inputs):
+    return prediction_writer is not None and not inputs["deferred"]
+
+
+def explanation_inputs(inputs):
+    return {
+        "skills": inputs["skills"],
+        "qualification": inputs["qualification"],
+        "experience_level": inputs["experience_level"],
+    }
+
+
+def predict_payload(prediction, job, explanation=None):
+    data = {
         "prediction_id": prediction.id,
-        "predicted_role": job
-        })
+        "predicted_role": job,
+    }
+    if explanation is not None:
+        data["explanation_status"] = explanation.status
+    return data
+
+
+# -----------------------------
+# Deferred explanation (poll until READY)
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def prediction_explanation(request, pk):
+    try:
+        explanation = PredictionExplanation.objects.get(
+            prediction_id=pk, prediction__user_id=request.user.id
+        )
+    except PredictionExplanation.DoesNotExist:
+        return Response({"error": "Explanation not found"}, status=404)
+
+    data = {"prediction_id": pk, "status": explanation.status}
+
+    if explanation.status == "READY":
+        data["predicted_role"] = explanation.predicted_role
+    elif explanation.status == "FAILED":
+        data["error"] = explanation.error
+
+    return Response(data)
+
+
+# --- BATCH PREDICT (ADMIN ONLY) ---
+@api_view(["POST"])
+@permission_classes([IsAdminUser])
+@admission_controlled
+def predict_batch_view(request):
+    """
+    Score a cohort of profiles in one model call.
+
+    Body: {"profiles": [{skills, qualification, experience_level, user_id?}, ...],
+           "save": bool, "explain": "full" | "fast" | "none"}
+    With save=true one Prediction row per profile is bulk-inserted, owned by
+    the profile's user_id (or the requesting admin).
+
+    A profile the model can't encode (unseen qualification / experience
+    level) gets {"prediction_id": null, "error": ...} instead of failing the
+    whole batch.
+    """
+    profiles = request.data.get("profiles")
+    save = _parse_bool(request.data.get("save", False))
+    explain = request.data.get("explain", settings.ML_EXPLAIN_DEFAULT)
+
+    if not isinstance(profiles, list) or not profiles:
+        return Response({"error": "No profiles provided"}, status=400)
+
+    if explain not in EXPLAIN_MODES:
+        return Response({"error": f"explain must be one of {', '.join(EXPLAIN_MODES)}"}, status=400)
+
+    if len(profiles) > settings.ML_BATCH_MAX_PROFILES:
+        return Response(
+            {"error": f"At most {settings.ML_BATCH_MAX_PROFILES} profiles per batch"},
+            status=400,
+        )
+
+    for i, p in enumerate(profiles):
+        if not isinstance(p, dict) or not (
+            p.get("skills") and p.get("qualification") and p.get("experience_level")
+        ):
+            return Response({"error": f"Missing fields in profile {i}"}, status=400)
+
+    if save:
+        user_ids = {p["user_id"] for p in profiles if p.get("user_id")}
+        known_ids = set(User.objects.filter(id__in=user_ids).values_list("id", flat=True))
+        if user_ids - known_ids:
+            return Response({"error": "Unknown user_id in profiles"}, status=400)
+
+    from .inference import predict_job_roles_partial
+
+    # bad profiles come back as errors; the rest are still scored in one call
+    jobs, errors, version = predict_job_roles_partial(profiles, explain=explain)
+
+    prediction_ids = [None] * len(jobs)
+
+    if save:
+        rows = []
+        row_positions = []
+        for i, (p, job) in enumerate(zip(profiles, jobs)):
+            if job is None:
+                continue
+
+            confidence = float(job[0].get("confidence", 0.0))
+            if confidence == 0.0:
+                continue
+
+            rows.append(Prediction(
+                user_id=p.get("user_id") or request.user.id,
+                predicted_roles=job[0]["role"].strip()[:255],
+                education_qualification=str(p["qualification"]).strip()[:100],
+                confidence_scores=confidence,
+                model_version=version,
+            ))
+            row_positions.append(i)
+
+        created = Prediction.objects.bulk_create(rows)
+        for i, prediction in zip(row_positions, created):
+            prediction_ids[i] = prediction.id
+
+    return Response({
+        "model_version": version,
+        "results": [
+            {"prediction_id": pid, "predicted_role": job}
+            if error is None else
+            {"prediction_id": None, "error": error}
+            for pid, job, error in zip(prediction_ids, jobs, errors)
+        ]
+    })
+
+
+def _parse_bool(value):
+    # JSON sends booleans; multipart / form posts send "true" / "false"
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+# -----------------------------
+# Model registry (Admin): list, activate and roll back published versions
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def model_versions(request):
+    from .artifacts import list_versions
+
+    return Response(list_versions())
+
+
+@api_view(["POST"])
+@permission_classes([IsAdminUser])
+def activate_model_version(request, version):
+    from .artifacts import activate_version
+
+    try:
+        activate_version(version)
+    except FileNotFoundError as exc:
+        return Response({"error": str(exc)}, status=404)
+
+    return Response({"active_version": version})
+
+
+@api_view(["POST"])
+@permission_classes([IsAdminUser])
+def rollback_model_version(request):
+    from .artifacts import rollback_version
+
+    try:
+        version = rollback_version()
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=409)
+
+    return Response({"active_version": version})
+
+
+# -----------------------------
+# Readiness probe (Public, for the load balancer)
+@api_view(["GET"])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def health_ready(request):
+    ready, details = readiness()
+    return Response(details, status=200 if ready else 503)
 
 
 # -----------------------------
@@ -87,15 +402,22 @@ def predict_view(request):
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def metadata_view(request):
+    data = read_metadata()
+
+    if data is None:
+        return Response({"error": "Metadata not found"}, status=404)
+
+    return Response(data)
+
+
+def read_metadata():
     metadata_path = os.path.join(os.path.dirname(settings.ML_MODEL_PATH), "metadata.json")
 
     if not os.path.exists(metadata_path):
-        return Response({"error": "Metadata not found"}, status=404)
+        return None
 
     with open(metadata_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    return Response(data)
+        return json.load(f)
 
 # -----------------------------
 # Dashboard prediction Data View (Authenticated)
@@ -126,14 +448,46 @@ User = get_user_model()
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def admin_stats(request):
+    from .predict import micro_batcher
+
+    report = _model_report()
+
     return Response({
         'total_users': User.objects.count(),
         'predictions': Prediction.objects.count(),
         'approved_roles': Prediction.objects.filter(is_approved=True).count(),
         'flagged_predictions': Prediction.objects.filter(is_flagged=True).count(),
-        'model_accuracy': 0.87
+        'model_accuracy': report["accuracy"] if report else None,
+        # per-process counters (shared backend: this worker's lookups only)
+        'prediction_cache': prediction_cache.stats() if prediction_cache is not None else None,
+        'micro_batcher': micro_batcher.stats() if micro_batcher is not None else None,
+        'write_behind': prediction_writer.stats() if prediction_writer is not None else None,
+        'admission': admission.stats(),
     })
 
+def _model_report():
+    # evaluation report of the serving version, loaded with the model
+    from .predict import load_artifacts
+
+    try:
+        return load_artifacts().get("report")
+    except FileNotFoundError:
+        return None
+
+
+# -----------------------------
+# Model evaluation report (Admin)
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def model_report(request):
+    from .predict import model_version
+
+    report = _model_report()
+    if report is None:
+        return Response({"error": "No evaluation report for the current model"}, status=404)
+
+    return Response({"version": model_version(), "report": report})
+
 # -----------------------------
 # Fetch Recent Predictions
 @api_view(['GET'])
@@ -0,0 +1,75 @@
+import zlib
+
+import numpy as np
+from scipy import sparse
+
+
+# the store's matrix is [qualification, experience_level, skill columns...]
+N_CATEGORICAL = 2
+
+VOCAB_RANKS = ("frequency", "mi")
+
+
+def hash_bucket(skill, buckets):
+    """
+    Stable bucket of a normalized skill (crc32, not hash(): that is salted per process).
+    """
+    return zlib.crc32(skill.encode("utf-8")) % buckets
+
+
+def hash_skill_columns(X, skill_vocab, buckets):
+    """
+    Fold the skill columns of X into a fixed number of hashed buckets.
+
+    A bucket is 1 when any of the row's skills hashes into it, the same
+    thing FeatureEncoder writes at prediction time.
+    """
+    folding = sparse.csr_matrix(
+        (
+            np.ones(len(skill_vocab), dtype=np.float32),
+            [hash_bucket(skill, buckets) for skill in skill_vocab],
+            np.arange(len(skill_vocab) + 1),
+        ),
+        shape=(len(skill_vocab), buckets),
+    )
+
+    hashed = (X[:, N_CATEGORICAL:] @ folding).tocsr()
+    hashed.data[:] = 1
+    return sparse.hstack([X[:, :N_CATEGORICAL], hashed], format="csr", dtype=np.float32)
+
+
+def select_skills(X, y, min_df=1, max_features=0, rank="frequency"):
+    """
+    Indices (into the skill vocabulary) of the skills to keep, ascending.
+
+    Skills seen in fewer than min_df rows are dropped; of the rest, at most
+    max_features (0 = no limit) are kept, ranked by document frequency or by
+    mutual information with the role.
+    """
+    if rank not in VOCAB_RANKS:
+        raise ValueError(f"rank must be one of {', '.join(VOCAB_RANKS)}")
+
+    skills = X[:, N_CATEGORICAL:].tocsc()
+    df = np.diff(skills.indptr)
+    keep = np.flatnonzero(df >= min_df)
+
+    if max_features and len(keep) > max_features:
+        if rank == "mi":
+            from sklearn.feature_selection import mutual_info_classif
+
+            scores = mutual_info_classif(
+                skills[:, keep], y, discrete_features=True, random_state=42
+            )
+        else:
+            scores = df[keep]
+
+        # stable: ties keep vocabulary order
+        order = np.argsort(-scores, kind="stable")[:max_features]
+        keep = np.sort(keep[order])
+
+    return keep
+
+
+def keep_skill_columns(X, keep):
+    cols = np.concatenate([np.arange(N_CATEGORICAL), keep + N_CATEGORICAL])
+    return X[:, cols]
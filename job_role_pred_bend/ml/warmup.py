@@ -0,0 +1,85 @@
+import os
+import time
+import threading
+
+from django.conf import settings
+from django.utils import timezone
+
+
+# Per-process warm-up state, reported by /api/ml/health/ready/
+_state = {
+    "version": None,
+    "load_seconds": None,
+    "warmup_seconds": None,
+    "warmed_at": None,
+    "error": None,
+}
+_warm_lock = threading.Lock()
+
+
+def warm_up():
+    """
+    Load the current model and run a dummy prediction through it.
+
+    Called from MlConfig.ready() (in the gunicorn master with --preload, so
+    workers fork already warm) and again whenever a new model version lands.
+    Returns True when the current version is warm.
+    """
+    from .predict import load_artifacts, warm_up_model
+
+    with _warm_lock:
+        try:
+            artifacts = load_artifacts()
+        except FileNotFoundError as exc:
+            _state["error"] = str(exc)
+            return False
+
+        if _state["version"] == artifacts["version"]:
+            return True
+
+        started = time.perf_counter()
+
+        modes = ("none", "fast", "full") if settings.ML_WARMUP_FULL_EXPLAIN else ("none", "fast")
+        warm_up_model(artifacts, modes)
+
+        _state.update(
+            version=artifacts["version"],
+            load_seconds=artifacts.get("load_seconds"),
+            warmup_seconds=round(time.perf_counter() - started, 4),
+            warmed_at=timezone.now().isoformat(),
+            error=None,
+        )
+        return True
+
+
+def warm_up_in_background():
+    if _warm_lock.locked():
+        return
+    threading.Thread(target=warm_up, name="ml-warmup", daemon=True).start()
+
+
+def readiness():
+    """
+    (is_ready, details) for this worker: ready once the current model version is warm.
+    """
+    from .predict import load_artifacts
+
+    try:
+        current = load_artifacts()["version"]
+    except FileNotFoundError as exc:
+        return False, {"status": "no_model", "error": str(exc), "pid": os.getpid()}
+
+    ready = _state["version"] == current
+    if not ready:
+        # new or never-warmed model: warm it without holding up the probe
+        warm_up_in_background()
+
+    return ready, {
+        "status": "ready" if ready else "warming",
+        "model_version": current,
+        "warm_version": _state["version"],
+        "load_seconds": _state["load_seconds"],
+        "warmup_seconds": _state["warmup_seconds"],
+        "warmed_at": _state["warmed_at"],
+        "pid": os.getpid(),
+    }
@@ -0,0 +1,178 @@
+import time
+import atexit
+import logging
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import DatabaseError, InterfaceError, OperationalError, connection
+
+from accounts.models import Prediction
+
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """
+    Queues new rows of one model in memory and bulk-inserts them from a
+    background thread.
+
+    Each row gets its primary key up front from a block of id_block sequence
+    values reserved in one query (PostgreSQL), so the caller can hand the id
+    back before the INSERT happens. A batch is written once max_rows are
+    waiting or max_wait_ms after the oldest of them arrived, and whatever is
+    left is written when the process exits.
+    """
+
+    def __init__(self, model, max_rows, max_wait_ms, id_block):
+        self.model = model
+        self.max_rows = max_rows
+        self.max_wait = max_wait_ms / 1000
+        self.id_block = id_block
+
+        self._rows = []
+        self._oldest = None
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._worker = None
+
+        self._ids = deque()
+        self._id_lock = threading.Lock()
+
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+        self.dropped = 0
+
+    def add(self, **fields):
+        """
+        Unsaved instance with its id set; the row is written within max_wait_ms.
+        """
+        instance = self.model(pk=self._next_id(), **fields)
+
+        with self._cond:
+            if self._worker is None:
+                # started lazily so a gunicorn --preload master never owns it
+                self._worker = threading.Thread(
+                    target=self._run, name="ml-write-behind", daemon=True
+                )
+                self._worker.start()
+                atexit.register(self.flush)
+
+            if not self._rows:
+                self._oldest = time.monotonic()
+            self._rows.append(instance)
+            self._cond.notify()
+
+        return instance
+
+    def _next_id(self):
+        with self._id_lock:
+            if not self._ids:
+                self._ids.extend(self._reserve_ids(self.id_block))
+            return self._ids.popleft()
+
+    def _reserve_ids(self, n):
+        meta = self.model._meta
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)",
+                [meta.db_table, meta.pk.column, n],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._rows:
+                    self._cond.wait()
+
+                while len(self._rows) < self.max_rows:
+                    remaining = self._oldest + self.max_wait - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+            if not self.flush():
+                # database unreachable: the rows are back in the queue, try again later
+                time.sleep(max(self.max_wait, 1.0))
+
+    def flush(self):
+        """
+        Write everything queued so far. Returns False when the database was
+        unreachable (the unwritten rows are queued again).
+        """
+        with self._flush_lock:
+            with self._cond:
+                rows, self._rows = self._rows, []
+
+            if not rows:
+                return True
+
+            unwritten = self._write(rows)
+            if not unwritten:
+                return True
+
+            # drop the broken connection; the next attempt opens a new one
+            connection.close()
+            with self._cond:
+                self._rows[:0] = unwritten
+                self._oldest = time.monotonic()
+                self.failures += 1
+            return False
+
+    def _write(self, rows):
+        """
+        bulk_create rows, bisecting a rejected batch down to the rows the
+        database refuses (a deleted user's FK, bad data), which are logged and
+        dropped. Returns the rows left unwritten by a connection error.
+        """
+        pending = [rows]
+        while pending:
+            batch = pending.pop()
+            try:
+                self.model.objects.bulk_create(batch, batch_size=self.max_rows)
+            except (OperationalError, InterfaceError):
+                logger.exception("Write-behind flush of %d %s rows failed", len(batch), self.model.__name__)
+                return batch + [row for rest in reversed(pending) for row in rest]
+            except DatabaseError:
+                if len(batch) > 1:
+                    mid = len(batch) // 2
+                    pending.extend([batch[mid:], batch[:mid]])
+                    continue
+                logger.exception("Write-behind dropped %s row id=%s", self.model.__name__, batch[0].pk)
+                with self._cond:
+                    self.dropped += 1
+            else:
+                with self._cond:
+                    self.written += len(batch)
+                    self.batches += 1
+        return []
+
+    def stats(self):
+        with self._cond:
+            return {
+                "max_rows": self.max_rows,
+                "max_wait_ms": self.max_wait * 1000,
+                "queued": len(self._rows),
+                "written": self.written,
+                "batches": self.batches,
+                "avg_batch_size": round(self.written / self.batches, 2) if self.batches else 0.0,
+                "failed_flushes": self.failures,
+                "dropped_rows": self.dropped,
+                "reserved_ids": len(self._ids),
+            }
+
+
+# buffers Prediction INSERTs from predict_view; None when off (needs PostgreSQL sequences)
+prediction_writer = (
+    WriteBehindBuffer(
+        Prediction,
+        max_rows=settings.ML_WRITE_BEHIND_MAX_ROWS,
+        max_wait_ms=settings.ML_WRITE_BEHIND_MAX_WAIT_MS,
+        id_block=settings.ML_WRITE_BEHIND_ID_BLOCK,
+    )
+    if settings.ML_WRITE_BEHIND_ENABLED and connection.vendor == "postgresql"
+    else None
+)